@@ -1,16 +1,35 @@
 #!/usr/bin/env python
 import threading
 import time
-from monitor_market import monitor_market
-from telegram_bot import telegram_bot_loop
+import logging
+import profiler
+import stream
+from config import RUN_MODE
 
 def main():
+    if RUN_MODE == "processes":
+        # Supervisor: monitor, bot y renderer en procesos separados con reinicio automático
+        from supervisor import run_supervisor
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s [%(levelname)s] %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+        run_supervisor()
+        return
+
+    from monitor_market import monitor_market
+    from telegram_bot import telegram_bot_loop
+
+    profiler.start()
+    stream.start()
+
     # Iniciar el monitoreo del mercado
-    market_thread = threading.Thread(target=monitor_market, daemon=True)
+    market_thread = threading.Thread(target=monitor_market, name="monitor", daemon=True)
     market_thread.start()
     
     # Iniciar el bot de Telegram
-    telegram_thread = threading.Thread(target=telegram_bot_loop, daemon=True)
+    telegram_thread = threading.Thread(target=telegram_bot_loop, name="bot", daemon=True)
     telegram_thread.start()
     
     # Mantener el proceso principal vivo
@@ -1,4 +1,6 @@
 import time
+import math
+import numpy as np
 import pandas as pd
 import matplotlib
 matplotlib.use('Agg')  # Usa backend sin GUI
@@ -6,29 +8,17 @@ import matplotlib.pyplot as plt
 import io
 import requests
 import re
-from config import SYMBOL, TELEGRAM_TOKEN
+from config import SYMBOL, TELEGRAM_TOKEN, TIMEFRAME_MAPPING
 import mplfinance as mpf
-from market import fetch_data  # Usa la función actualizada de mercado
+from market import fetch_frame  # Velas leídas del buffer columnar compartido
+from candles import format_interval
 
-# Mapeo de posibles intervalos válidos
-TIMEFRAME_MAPPING = {
-    "1m": "1m",
-    "3m": "3m",
-    "5m": "5m",
-    "10m": "5m",      # Si se ingresa 10m, se mapea a 5m (ajustable)
-    "15m": "15m",
-    "30m": "30m",
-    "1h": "1h",
-    "2h": "2h",
-    "4h": "4h",
-    "6h": "6h",
-    "8h": "8h",
-    "12h": "12h",
-    "1d": "1d",
-    "3d": "3d",
-    "1w": "1w",
-    "1M": "1M"
-}
+# Tamaño de salida de los gráficos. El número de puntos dibujados se limita al ancho en píxeles.
+LINE_FIGSIZE = (10, 6)
+LINE_DPI = 100
+CANDLE_FIGWIDTH = 8     # Ancho (pulgadas) de la figura por defecto de mplfinance
+CANDLE_DPI = 150
+MIN_CANDLE_PX = 4       # Píxeles mínimos por vela para que siga siendo legible
 
 def extract_timeframe(text):
     """
@@ -42,40 +32,103 @@ def extract_timeframe(text):
             return TIMEFRAME_MAPPING[match]
     return "1h"
 
-def fetch_chart_data(symbol=SYMBOL, timeframe="1h", limit=100):
+def lttb_indices(values, threshold):
     """
-    Obtiene datos OHLCV para el gráfico usando la función fetch_data.
-    Se asegura de que el índice sea un DatetimeIndex.
+    Largest-Triangle-Three-Buckets: selecciona 'threshold' índices de 'values' que preservan
+    la forma visual de la serie. Siempre conserva el primer y el último punto.
     """
-    data = fetch_data(symbol=symbol, timeframe=timeframe, limit=limit)
-    data = data.copy()
-    if 'volume' not in data.columns:
-        data['volume'] = 0
-    # Establecer 'timestamp' como índice para que mplfinance lo reconozca
-    data.set_index('timestamp', inplace=True)
-    return data
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    y = np.asarray(values, dtype=np.float64)
+    x = np.arange(n, dtype=np.float64)
+    bucket = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket) + 1
+        end = int((i + 1) * bucket) + 1
+        # Promedio del siguiente bucket (o el último punto para el bucket final)
+        next_end = min(max(int((i + 2) * bucket) + 1, end + 1), n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
 
-def send_graphic(chat_id, timeframe_input="1h", chart_type="line"):
+def aggregate_ohlc(data, max_candles, overlays=()):
+    """
+    Re-agrega velas consecutivas en grupos de tamaño fijo para no superar 'max_candles'.
+    Para las series de 'overlays' (ya calculadas a resolución completa) se toma el valor
+    al cierre de cada grupo. Retorna (data_agregada, [overlays_agregados]).
+    """
+    n = len(data)
+    if n <= max_candles:
+        return data, list(overlays)
+    size = math.ceil(n / max_candles)
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+    index = data.index[starts]
+    aggregated = pd.DataFrame({
+        'open': data['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(data['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(data['low'].to_numpy(), starts),
+        'close': data['close'].to_numpy()[ends],
+        'volume': np.add.reduceat(data['volume'].to_numpy(), starts)
+    }, index=index)
+    return aggregated, [pd.Series(series.to_numpy()[ends], index=index) for series in overlays]
+
+def fetch_chart_data(symbol=SYMBOL, timeframe="1h", limit=100, days=14):
+    """
+    Obtiene datos OHLCV para el gráfico a partir del CandleBuffer de la moneda.
+    El DataFrame se construye directamente del buffer compartido con 'timestamp' como
+    DatetimeIndex para que mplfinance lo reconozca, sin copias ni re-indexado intermedios.
+    """
+    return fetch_frame(symbol, timeframe, days, index=True)
+
+def chart_caption(interval_ms, days, group=1):
+    """
+    Título del gráfico con la resolución real de lo dibujado: el intervalo de las velas del
+    buffer (que con CoinGecko depende del rango) y, si se re-agregaron, el tamaño del grupo.
+    """
+    period = f"{days} día" if days == 1 else f"{days} días"
+    if not interval_ms:
+        return f"Gráfico de {SYMBOL} - {period}"
+    candles = format_interval(interval_ms * group)
+    if group > 1:
+        candles += f" ({group} × {format_interval(interval_ms)})"
+    return f"Gráfico de {SYMBOL} - {period}, velas de {candles}"
+
+def send_graphic(chat_id, timeframe_input="1h", chart_type="line", days=14):
     """
     Genera un gráfico de las últimas velas y lo envía a Telegram.
     
     Parámetros:
       - timeframe_input: intervalo solicitado (se mapea a un valor válido).
       - chart_type: 'line' para gráfico lineal o 'candlestick' para velas japonesas.
+      - days: rango de días a graficar.
+
+    Soportes, resistencias y SMAs se calculan sobre los datos a resolución completa; después
+    los puntos dibujados se limitan al ancho en píxeles de la imagen (LTTB para el gráfico
+    lineal, re-agregación OHLC para velas), de modo que rangos largos no encarecen el render.
     """
     try:
         # Extraer y validar el intervalo
         timeframe = extract_timeframe(timeframe_input)
-        data = fetch_chart_data(SYMBOL, timeframe, limit=100)
+        data = fetch_chart_data(SYMBOL, timeframe, limit=100, days=days)
         
-        # Calcular soportes, resistencias y medias móviles
+        # Calcular soportes, resistencias y medias móviles (resolución completa)
         support = data['close'].min()
         resistance = data['close'].max()
         sma20 = data['close'].rolling(window=20).mean()
         sma50 = data['close'].rolling(window=50).mean()
         
         buf = io.BytesIO()
-        caption = f"Gráfico de {SYMBOL} - {timeframe}"
+        interval_ms = data.attrs.get('interval_ms')
+        caption = chart_caption(interval_ms, days)
         
         # Crear un estilo futurista personalizado
         mc = mpf.make_marketcolors(
@@ -102,29 +155,35 @@ def send_graphic(chat_id, timeframe_input="1h", chart_type="line"):
         )
         
         if chart_type.lower() == "candlestick":
-            ap0 = mpf.make_addplot(sma20, color='#00ffff', width=1.0, linestyle='-')
-            ap1 = mpf.make_addplot(sma50, color='#ff00ff', width=1.0, linestyle='-')
+            max_candles = CANDLE_FIGWIDTH * CANDLE_DPI // MIN_CANDLE_PX
+            group = math.ceil(len(data) / max_candles)
+            data, (sma20, sma50) = aggregate_ohlc(data, max_candles, (sma20, sma50))
+            caption = chart_caption(interval_ms, days, group)
+            # mplfinance falla con series completamente NaN (ej. SMA50 con pocas velas de 4 días)
+            addplots = [mpf.make_addplot(sma, color=color, width=1.0, linestyle='-')
+                        for sma, color in ((sma20, '#00ffff'), (sma50, '#ff00ff')) if sma.notna().any()]
             sr_support = [support] * len(data)
             sr_resistance = [resistance] * len(data)
-            ap2 = mpf.make_addplot(sr_support, color='yellow', linestyle='--', width=0.8)
-            ap3 = mpf.make_addplot(sr_resistance, color='orange', linestyle='--', width=0.8)
+            addplots.append(mpf.make_addplot(sr_support, color='yellow', linestyle='--', width=0.8))
+            addplots.append(mpf.make_addplot(sr_resistance, color='orange', linestyle='--', width=0.8))
             fig, _ = mpf.plot(
                 data,
                 type='candle',
                 style=futuristic_style,
                 title=caption,
                 volume=False,
-                addplot=[ap0, ap1, ap2, ap3],
+                addplot=addplots,
                 returnfig=True
             )
             fig.suptitle(caption, y=0.95, fontsize=16, color='white')
-            fig.savefig(buf, dpi=150, format='png')
+            fig.savefig(buf, dpi=CANDLE_DPI, format='png')
             plt.close(fig)
         else:
-            plt.figure(figsize=(10, 6))
-            plt.plot(data.index, data['close'], label="Precio", color='#00ff00')
-            plt.plot(data.index, sma20, label="SMA20", color='#00ffff')
-            plt.plot(data.index, sma50, label="SMA50", color='#ff00ff')
+            idx = lttb_indices(data['close'].to_numpy(), LINE_FIGSIZE[0] * LINE_DPI)
+            plt.figure(figsize=LINE_FIGSIZE)
+            plt.plot(data.index[idx], data['close'].iloc[idx], label="Precio", color='#00ff00')
+            plt.plot(data.index[idx], sma20.iloc[idx], label="SMA20", color='#00ffff')
+            plt.plot(data.index[idx], sma50.iloc[idx], label="SMA50", color='#ff00ff')
             plt.axhline(support, color='yellow', linestyle='--', label="Soporte")
             plt.axhline(resistance, color='orange', linestyle='--', label="Resistencia")
             plt.title(caption, fontsize=16, color='white')
@@ -133,7 +192,7 @@ def send_graphic(chat_id, timeframe_input="1h", chart_type="line"):
             plt.legend()
             plt.grid(True, linestyle="--", alpha=0.7, color='gray')
             plt.gca().set_facecolor('#0f0f0f')
-            plt.savefig(buf, format="png")
+            plt.savefig(buf, dpi=LINE_DPI, format="png")
             plt.close()
         
         buf.seek(0)
@@ -5,6 +5,7 @@ from config import TIMEFRAME
 from ta.momentum import RSIIndicator
 from ta.trend import MACD, SMAIndicator
 from ta.volatility import BollingerBands
+from ta.volume import ChaikinMoneyFlowIndicator
 
 def get_btc_indicators():
     """
@@ -19,6 +20,7 @@ def get_btc_indicators():
     close = data['close']
     high = data['high']
     low = data['low']
+    volume = data['volume']
     price = close.iloc[-1]
 
     rsi_series = RSIIndicator(close, window=14).rsi().dropna()
@@ -44,8 +46,11 @@ def get_btc_indicators():
     bb_high_series = bb_indicator.bollinger_hband().dropna()
     bb_high = bb_high_series.iloc[-1] if not bb_high_series.empty else None
 
-    # Valores fijos para CMF y volumen (se pueden ajustar)
+    # CMF: solo se calcula con volumen real (stream del exchange); CoinGecko no lo proporciona
     cmf = 0
+    if volume.sum() > 0:
+        cmf_series = ChaikinMoneyFlowIndicator(high, low, close, volume).chaikin_money_flow().dropna()
+        cmf = cmf_series.iloc[-1] if not cmf_series.empty else 0
     volume_level = "N/A"
     dominance = fetch_btc_dominance()
 
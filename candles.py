@@ -0,0 +1,205 @@
+import threading
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Duración en milisegundos de las unidades de intervalo (ej. "4h" -> 4 * 3_600_000)
+INTERVAL_UNITS_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+def interval_to_ms(interval):
+    """Convierte un intervalo como "30m", "4h" o "4d" a milisegundos."""
+    return int(interval[:-1]) * INTERVAL_UNITS_MS[interval[-1]]
+
+def format_interval(interval_ms):
+    """Inverso de interval_to_ms: 14_400_000 -> "4h" (usa la mayor unidad exacta)."""
+    for unit, size in sorted(INTERVAL_UNITS_MS.items(), key=lambda item: -item[1]):
+        if interval_ms % size == 0:
+            return f"{interval_ms // size}{unit}"
+    return f"{interval_ms // 1000}s"
+
+def infer_interval_ms(timestamps):
+    """
+    Estima el intervalo de las velas como la mediana de las diferencias entre timestamps.
+    Retorna None si hay menos de 3 velas (la última suele estar en curso y no es fiable).
+    """
+    if len(timestamps) < 3:
+        return None
+    return int(np.median(np.diff(np.asarray(timestamps, dtype=np.int64))))
+
+class CandleBuffer:
+    """
+    Contenedor de velas de capacidad fija respaldado por arreglos contiguos de NumPy.
+
+    - Timestamps en int64 (milisegundos) y OHLCV en float64.
+    - Buffer circular con append O(1): cada valor se escribe dos veces (posición i e i + capacity),
+      de modo que la ventana de las últimas velas siempre es un bloque contiguo y se puede
+      devolver como vista sin copiar.
+    - Las vistas son de solo lectura y reflejan el contenido actual; un append posterior puede
+      sobrescribir sus valores cuando el buffer está lleno. Si otro hilo escribe en el buffer,
+      usar copy() o to_dataframe(), que leen bajo el lock del buffer.
+    - Un buffer solo admite velas de un intervalo (interval_ms); merge rechaza lotes de otro.
+    - El DataFrame solo se construye bajo demanda con to_dataframe().
+    """
+    __slots__ = ('capacity', 'interval_ms', '_ts', '_ohlcv', '_head', '_size', '_lock')
+
+    def __init__(self, capacity=1000, interval_ms=None):
+        if capacity < 1:
+            raise ValueError("La capacidad del buffer debe ser mayor que cero.")
+        self.capacity = capacity
+        self.interval_ms = interval_ms
+        self._ts = np.zeros(2 * capacity, dtype=np.int64)
+        self._ohlcv = np.zeros((len(OHLCV_COLUMNS), 2 * capacity), dtype=np.float64)
+        self._head = 0  # Próxima posición de escritura en [0, capacity)
+        self._size = 0
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_ohlc(cls, rows, capacity=None):
+        """
+        Crea un buffer a partir de filas [timestamp, open, high, low, close(, volume)],
+        el formato que devuelve el endpoint /ohlc de CoinGecko.
+        """
+        rows = list(rows)
+        buf = cls(capacity or max(len(rows), 1))
+        buf.merge(rows)
+        return buf
+
+    @classmethod
+    def from_arrays(cls, timestamps, ohlcv, interval_ms=None, capacity=None):
+        """
+        Crea un buffer a partir de un arreglo de timestamps y otro (5, n) de OHLCV,
+        el formato que devuelve snapshot().
+        """
+        n = len(timestamps)
+        buf = cls(capacity or max(n, 1), interval_ms)
+        n = min(n, buf.capacity)
+        if n:
+            # Se llena la ventana final [capacity - n, capacity) y su espejo, con la cabeza en 0
+            start = buf.capacity - n
+            for offset in (0, buf.capacity):
+                buf._ts[start + offset:buf.capacity + offset] = timestamps[-n:]
+                buf._ohlcv[:, start + offset:buf.capacity + offset] = ohlcv[:, -n:]
+            buf._size = n
+        return buf
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp, open_, high, low, close, volume=0.0):
+        """Agrega una vela al final del buffer, descartando la más antigua si está lleno."""
+        with self._lock:
+            i = self._head
+            j = i + self.capacity
+            self._ts[i] = self._ts[j] = timestamp
+            self._ohlcv[:, i] = self._ohlcv[:, j] = (open_, high, low, close, volume)
+            self._head = (i + 1) % self.capacity
+            if self._size < self.capacity:
+                self._size += 1
+
+    def update_last(self, open_, high, low, close, volume=0.0):
+        """Sobrescribe la última vela (vela en curso) sin avanzar el buffer."""
+        with self._lock:
+            if not self._size:
+                raise ValueError("El buffer está vacío.")
+            i = (self._head - 1) % self.capacity
+            self._ohlcv[:, i] = self._ohlcv[:, i + self.capacity] = (open_, high, low, close, volume)
+
+    def merge(self, rows):
+        """
+        Incorpora filas [timestamp, open, high, low, close(, volume)] ordenadas por tiempo.
+        Las filas anteriores a la última vela se ignoran, la que coincide con ella la actualiza
+        y las posteriores se agregan. Retorna el número de velas nuevas.
+        Lanza ValueError si el intervalo de las filas no coincide con el del buffer.
+        """
+        rows = list(rows)
+        incoming = infer_interval_ms([row[0] for row in rows])
+        with self._lock:
+            if incoming is not None:
+                if self.interval_ms is None:
+                    self.interval_ms = incoming
+                elif incoming != self.interval_ms:
+                    raise ValueError(f"Intervalo de velas distinto al del buffer "
+                                     f"({incoming} ms frente a {self.interval_ms} ms).")
+            added = 0
+            for row in rows:
+                ts = int(row[0])
+                values = tuple(row[1:5]) + ((row[5],) if len(row) > 5 else (0.0,))
+                last = self.last_timestamp
+                if last is not None and ts < last:
+                    continue
+                if last is not None and ts == last:
+                    self.update_last(*values)
+                else:
+                    self.append(ts, *values)
+                    added += 1
+            return added
+
+    @property
+    def last_timestamp(self):
+        if not self._size:
+            return None
+        return int(self._ts[(self._head - 1) % self.capacity])
+
+    def count_since(self, timestamp):
+        """Número de velas con timestamp (ms) mayor o igual al indicado."""
+        with self._lock:
+            return int(np.count_nonzero(self.timestamps() >= timestamp))
+
+    def _window(self, n=None):
+        n = self._size if n is None else min(n, self._size)
+        end = self._head + self.capacity
+        return end - n, end
+
+    def _view(self, arr, n=None):
+        start, end = self._window(n)
+        view = arr[..., start:end]
+        view.flags.writeable = False
+        return view
+
+    def timestamps(self, n=None):
+        """Vista (sin copia) de los últimos n timestamps en milisegundos."""
+        return self._view(self._ts, n)
+
+    def column(self, name, n=None):
+        """Vista (sin copia) de los últimos n valores de la columna OHLCV indicada."""
+        return self._view(self._ohlcv[OHLCV_COLUMNS.index(name)], n)
+
+    def ohlcv(self, n=None):
+        """Vista (sin copia) de forma (5, n) con las columnas open, high, low, close y volume."""
+        return self._view(self._ohlcv, n)
+
+    @property
+    def close(self):
+        return self.column('close')
+
+    def snapshot(self, n=None):
+        """Copia consistente (timestamps, ohlcv) de las últimas n velas, tomada bajo el lock."""
+        with self._lock:
+            start, end = self._window(n)
+            return self._ts[start:end].copy(), self._ohlcv[:, start:end].copy()
+
+    def copy(self, n=None):
+        """Buffer independiente con las últimas n velas, para leerlo sin competir con escritores."""
+        timestamps, ohlcv = self.snapshot(n)
+        return CandleBuffer.from_arrays(timestamps, ohlcv, self.interval_ms)
+
+    def to_dataframe(self, n=None, index=False, since=None):
+        """
+        Construye un DataFrame con el mismo formato que devuelve market.fetch_data.
+        Si se indica 'since' (ms), se toman las velas desde ese instante (mínimo 2) en lugar de n.
+        Si index=True, 'timestamp' se usa como DatetimeIndex (formato que espera mplfinance).
+        El intervalo de las velas queda en df.attrs['interval_ms'].
+        """
+        with self._lock:
+            if since is not None:
+                n = max(self.count_since(since), 2)
+            ts, ohlcv = self.snapshot(n)
+        timestamps = pd.to_datetime(ts, unit='ms')
+        data = dict(zip(OHLCV_COLUMNS, ohlcv))
+        if index:
+            df = pd.DataFrame(data, index=pd.DatetimeIndex(timestamps, name='timestamp'))
+        else:
+            df = pd.DataFrame({'timestamp': timestamps, **data})
+        df.attrs['interval_ms'] = self.interval_ms if self.interval_ms is not None else infer_interval_ms(ts)
+        return df
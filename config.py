@@ -15,3 +15,66 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")  # Pon aquí tu API key de Open
 SYMBOL = os.getenv("SYMBOL", "BNB/USDT")  # Símbolo para análisis
 TIMEFRAME = os.getenv("TIMEFRAME", "1h")   # Temporalidad de las velas
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "5"))
+
+# Mapeo de posibles intervalos válidos
+TIMEFRAME_MAPPING = {
+    "1m": "1m",
+    "3m": "3m",
+    "5m": "5m",
+    "10m": "5m",      # Si se ingresa 10m, se mapea a 5m (ajustable)
+    "15m": "15m",
+    "30m": "30m",
+    "1h": "1h",
+    "2h": "2h",
+    "4h": "4h",
+    "6h": "6h",
+    "8h": "8h",
+    "12h": "12h",
+    "1d": "1d",
+    "3d": "3d",
+    "1w": "1w",
+    "1M": "1M"
+}
+
+# --- Ticker ligero (precios por lote) ---
+# Monedas (IDs o símbolos cortos) cuyo precio se consulta en una sola petición a /simple/price.
+WATCHLIST = [c.strip() for c in os.getenv("WATCHLIST", "binancecoin,bitcoin").split(",") if c.strip()]
+PRICE_CACHE_TTL = int(os.getenv("PRICE_CACHE_TTL", "30"))  # Segundos de validez de la tabla de precios
+CANDLE_CAPACITY = int(os.getenv("CANDLE_CAPACITY", "2000"))  # Velas retenidas en memoria por moneda
+CANDLE_HISTORY_DIR = os.getenv("CANDLE_HISTORY_DIR", "data/candles")  # Historial de velas en disco (entrenamiento)
+
+# --- Modo de despliegue ---
+# "threads": monitor y bot como hilos de un mismo proceso.
+# "processes": supervisor con monitor, bot y renderer en procesos separados.
+RUN_MODE = os.getenv("RUN_MODE", "threads")
+HEALTH_CHECK_INTERVAL = int(os.getenv("HEALTH_CHECK_INTERVAL", "15"))  # Segundos entre chequeos de salud
+SNAPSHOT_MAX_AGE = int(os.getenv("SNAPSHOT_MAX_AGE", "600"))  # Antigüedad máxima de indicadores publicados por el monitor
+WATCHLIST_SNAPSHOT = "WATCHLIST"  # Clave del snapshot con las señales del screener de toda la lista
+
+# --- Prompt de OpenAI ---
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")  # Modelo para análisis completos
+OPENAI_FAST_MODEL = os.getenv("OPENAI_FAST_MODEL", "gpt-3.5-turbo")  # Modelo para seguimientos cortos
+PROMPT_INPUT_BUDGET = int(os.getenv("PROMPT_INPUT_BUDGET", "1200"))  # Tokens máximos de entrada por consulta
+
+# --- Profiler de muestreo (opcional) ---
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+PROFILER_INTERVAL_MS = int(os.getenv("PROFILER_INTERVAL_MS", "100"))  # Milisegundos entre muestras
+PROFILER_FLUSH_SECONDS = int(os.getenv("PROFILER_FLUSH_SECONDS", "300"))  # Cada cuánto se escribe un archivo
+PROFILER_DIR = os.getenv("PROFILER_DIR", "profiles")
+PROFILER_KEEP = int(os.getenv("PROFILER_KEEP", "12"))  # Archivos conservados por rol
+
+# --- Fuente de datos de mercado ---
+# "rest": polling de CoinGecko. "stream": velas en vivo por websocket (ccxt.pro) con respaldo REST.
+DATA_SOURCE = os.getenv("DATA_SOURCE", "rest")
+STREAM_EXCHANGE = os.getenv("STREAM_EXCHANGE", "binance")
+STREAM_SYMBOLS = [s.strip() for s in os.getenv("STREAM_SYMBOLS", "BNB/USDT,BTC/USDT").split(",") if s.strip()]
+STREAM_WS_URL = os.getenv("STREAM_WS_URL", "")  # Sustituye la URL websocket del exchange (ej. servidor local de pruebas)
+STREAM_REST_URL = os.getenv("STREAM_REST_URL", "")  # Sustituye el servidor REST del exchange (mercados y relleno de huecos)
+STREAM_MAX_AGE = int(os.getenv("STREAM_MAX_AGE", "120"))  # Segundos sin datos tras los que se vuelve a CoinGecko
+STREAM_PUBLISH_INTERVAL = int(os.getenv("STREAM_PUBLISH_INTERVAL", "5"))  # Segundos entre publicaciones de velas a otros procesos
+
+# --- Modelo XGBoost de puntuación de señales ---
+ML_MODEL_PATH = os.getenv("ML_MODEL_PATH", "models/higgs_xgb.json")
+ML_SIGNAL_THRESHOLD = float(os.getenv("ML_SIGNAL_THRESHOLD", "0.7"))  # Probabilidad mínima para alertar
+ML_LATENCY_TARGET_MS = float(os.getenv("ML_LATENCY_TARGET_MS", "50"))  # Objetivo de latencia por ciclo
+ML_HORIZON = int(os.getenv("ML_HORIZON", "6"))  # Velas hacia adelante para la etiqueta de entrenamiento
@@ -2,6 +2,7 @@ import pandas as pd
 from ta.momentum import RSIIndicator
 from ta.trend import MACD, SMAIndicator, ADXIndicator
 from ta.volatility import BollingerBands
+from ta.volume import ChaikinMoneyFlowIndicator
 from market import fetch_data
 from config import TIMEFRAME
 
@@ -54,8 +55,11 @@ def calculate_indicators_for_bnb(data=None):
     bb_high_series = bb_indicator.bollinger_hband().dropna()
     bb_high = bb_high_series.iloc[-1] if not bb_high_series.empty else None
 
-    # CMF y volumen (valores fijos o se pueden calcular)
+    # CMF: solo se calcula con volumen real (stream del exchange); CoinGecko no lo proporciona
     cmf = 0
+    if volume.sum() > 0:
+        cmf_series = ChaikinMoneyFlowIndicator(high, low, close, volume).chaikin_money_flow().dropna()
+        cmf = cmf_series.iloc[-1] if not cmf_series.empty else 0
     volume_level = "N/A"
     prev_close = close.iloc[-2] if len(close) >= 2 else close.iloc[-1]
 
@@ -0,0 +1,190 @@
+import re
+import time
+from config import TIMEFRAME_MAPPING
+
+# Tabla declarativa de intenciones, en orden de prioridad (la primera que aparece gana).
+# - keywords: subcadenas que activan la intención (mismo criterio que el antiguo `in`).
+# - needs_asset: si requiere resolver el activo (BNB/BTC) antes de responder.
+# - blocked_by: palabras que anulan la intención (ej. "indicador" anula "rsi").
+INTENTS = [
+    {"name": "grafico", "keywords": ["grafico", "gráfico"], "needs_asset": False},
+    {"name": "dominancia", "keywords": ["dominancia"], "needs_asset": False},
+    {"name": "precio", "keywords": ["precio"], "needs_asset": True},
+    {"name": "analisis", "keywords": ["analiza", "análisis", "analisis", "compara", "estrategia", "actualizacion",
+                                      "actualización", "indicadores", "entrada", "long", "short", "cruce", "movil"],
+     "needs_asset": True},
+    # Intenciones del screener, por debajo de "analisis" para no quitarle consultas a GPT
+    # (ej. "análisis de compresión en btc")
+    {"name": "ranking", "keywords": ["ranking"], "needs_asset": False},
+    {"name": "squeeze", "keywords": ["squeeze", "compresion", "compresión"], "needs_asset": False},
+    {"name": "rsi", "keywords": ["rsi"], "needs_asset": True, "blocked_by": ["indicador"]},
+    {"name": "macd", "keywords": ["macd"], "needs_asset": True},
+    {"name": "sma", "keywords": ["sma"], "needs_asset": True},
+    {"name": "cmf", "keywords": ["cmf"], "needs_asset": True},
+]
+
+# Saludos: solo cuando el mensaje completo es el saludo (búsqueda O(1) en un set)
+GREETINGS = {"hola", "que onda", "buenos", "saludos"}
+
+# Palabras que no son intenciones pero modifican la respuesta
+ASSET_KEYWORDS = {"btc": "BTC", "bnb": "BNB"}
+CANDLESTICK_KEYWORDS = ["vela", "candlestick", "japonesas"]
+MODIFIER_KEYWORDS = ["indicador"]
+
+_priority = {intent["name"]: i for i, intent in enumerate(INTENTS)}
+_intent_by_name = {intent["name"]: intent for intent in INTENTS}
+_keyword_owner = {}
+for _intent in INTENTS:
+    for _kw in _intent["keywords"]:
+        _keyword_owner.setdefault(_kw, _intent["name"])
+for _kw in list(ASSET_KEYWORDS) + CANDLESTICK_KEYWORDS + MODIFIER_KEYWORDS:
+    _keyword_owner.setdefault(_kw, None)
+
+def _trie_regex(words):
+    """
+    Convierte una lista de palabras en una alternancia con prefijos compartidos
+    (ej. "anali(?:za|sis)"), de modo que cada posición del texto se descarta tras leer
+    un solo carácter en lugar de probar cada palabra por separado.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        end = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Si una palabra termina aquí, la continuación es opcional (gana la coincidencia más larga)
+        return f"(?:{body})?" if end else body
+
+    return build(trie)
+
+# Una única expresión regular compilada: rango en días, intervalo y todas las palabras clave.
+_PATTERN = re.compile(
+    r"(?P<days>\b\d+\s*d[ií]as?\b)"
+    r"|(?P<tf>\b\d+[mhdwM]\b)"
+    r"|(?P<kw>" + _trie_regex(_keyword_owner) + ")"
+)
+
+_handlers = {}
+
+def register(intent):
+    """Decorador que registra la función que atiende una intención (ver dispatch)."""
+    def decorator(func):
+        _handlers[intent] = func
+        return func
+    return decorator
+
+def route(text):
+    """
+    Clasifica el mensaje con una sola pasada de la expresión compilada.
+    Retorna un dict con:
+      - intent: intención de mayor prioridad ("saludo", "grafico", ..., o None).
+      - needs_asset: si la intención requiere activo.
+      - activo: "BTC"/"BNB" mencionado en el mensaje (BTC tiene prioridad) o None.
+      - timeframe: primer intervalo mencionado que figura en TIMEFRAME_MAPPING (ej. "4h") o "1h",
+                   igual que PrintGraphic.extract_timeframe.
+      - days: rango en días mencionado o None.
+      - chart_type: "candlestick" si se piden velas; si no, "line".
+    """
+    lower = text.lower()
+    result = {"intent": None, "needs_asset": False, "activo": None, "timeframe": "1h",
+              "days": None, "chart_type": "line"}
+    if lower in GREETINGS:
+        result["intent"] = "saludo"
+        return result
+
+    keywords = set()
+    timeframe = None
+    for match in _PATTERN.finditer(lower):
+        kind = match.lastgroup
+        if kind == "kw":
+            keywords.add(match.group())
+        elif kind == "tf" and timeframe is None and match.group() in TIMEFRAME_MAPPING:
+            timeframe = match.group()
+        elif kind == "days" and result["days"] is None:
+            result["days"] = int(re.match(r"\d+", match.group()).group())
+    if timeframe:
+        result["timeframe"] = timeframe
+
+    if "btc" in keywords:
+        result["activo"] = "BTC"
+    elif "bnb" in keywords:
+        result["activo"] = "BNB"
+    if keywords.intersection(CANDLESTICK_KEYWORDS):
+        result["chart_type"] = "candlestick"
+
+    candidates = set()
+    for kw in keywords:
+        owner = _keyword_owner.get(kw)
+        if owner and not keywords.intersection(_intent_by_name[owner].get("blocked_by", [])):
+            candidates.add(owner)
+    if candidates:
+        intent = min(candidates, key=_priority.get)
+        result["intent"] = intent
+        result["needs_asset"] = _intent_by_name[intent]["needs_asset"]
+    return result
+
+def dispatch(intent, *args, **kwargs):
+    """
+    Llama a la función registrada para la intención. Retorna False si no hay ninguna
+    (el llamador responde con el mensaje de fallback).
+    """
+    handler = _handlers.get(intent)
+    if handler is None:
+        return False
+    handler(*args, **kwargs)
+    return True
+
+# Muestra de mensajes reales del bot para el benchmark (python intent_router.py)
+BENCHMARK_MESSAGES = [
+    "hola", "precio", "precio bnb", "cual es el precio de btc?", "grafico 4h", "gráfico de velas 1d",
+    "grafico 90 dias velas japonesas", "dominancia", "como esta la dominancia de btc hoy",
+    "analiza bnb", "haz un análisis completo de btc con estrategia de entrada", "long o short?",
+    "rsi", "rsi de btc", "que dicen los indicadores", "indicador rsi", "macd bnb", "sma", "cmf btc",
+    "ranking rsi", "que monedas estan en squeeze", "y ahora?", "gracias agente", "btc", "bnb",
+    "cruce de medias moviles en bnb", "actualización de btc por favor", "compara bnb con btc",
+]
+
+def _linear_cascade(lower):
+    """
+    Clasificación anterior de handle_telegram_message (una búsqueda de subcadenas por rama),
+    solo para el benchmark. Como el handler anterior, el intervalo y el rango solo se extraen
+    para los gráficos y el activo solo para las intenciones que lo necesitan.
+    """
+    if lower in GREETINGS:
+        return "saludo"
+    for intent in INTENTS:
+        if any(kw in lower for kw in intent["keywords"]):
+            if any(b in lower for b in intent.get("blocked_by", [])):
+                continue
+            if intent["name"] == "grafico":
+                timeframe = re.findall(r'\b(\d+m|\d+h|\d+d|\d+w|\d+M)\b', lower)
+                days = re.search(r'\b(\d+)\s*d[ií]as?\b', lower)
+            elif intent["needs_asset"]:
+                activo = "BTC" if "btc" in lower else "BNB" if "bnb" in lower else None
+            return intent["name"]
+    return None
+
+def benchmark(messages=BENCHMARK_MESSAGES, rounds=2000):
+    """Compara route() con la cascada lineal sobre 'messages' y verifica que coinciden."""
+    for text in messages:
+        expected = _linear_cascade(text.lower())
+        got = route(text)["intent"]
+        if expected != got:
+            print(f"[Aviso] Diferencia en '{text}': cascada={expected} router={got}")
+    for name, func in (("router", route), ("cascada", lambda t: _linear_cascade(t.lower()))):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for text in messages:
+                func(text)
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {elapsed / (rounds * len(messages)) * 1e6:.2f} µs/mensaje")
+
+if __name__ == "__main__":
+    benchmark()
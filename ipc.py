@@ -0,0 +1,87 @@
+import time
+from candles import CandleBuffer
+
+# Canal compartido entre procesos. Solo existe en modo multiproceso (RUN_MODE=processes);
+# en modo hilos queda en None y todas las funciones son no-ops o devuelven valores vacíos.
+#   - "heartbeats": { rol: timestamp del último latido }
+#   - "snapshots":  { activo: {"ts": timestamp, "indicators": dict} }
+#   - "candles":    { coin_id: {"ts": timestamp, "timestamps", "ohlcv", "interval_ms"} } (velas del stream)
+#   - "render_queue": cola de trabajos de gráficos para el rol renderer
+_channel = None
+_role = None
+
+def attach(channel, role=None):
+    """Conecta el proceso actual al canal compartido creado por el supervisor."""
+    global _channel, _role
+    _channel = channel
+    _role = role
+
+def current_role():
+    """Rol del proceso actual ("monitor", "bot", "renderer") o None en modo hilos."""
+    return _role
+
+def heartbeat(role=None):
+    """Registra un latido del rol indicado (por defecto, el del proceso actual)."""
+    role = role or _role
+    if _channel is None or role is None:
+        return
+    _channel["heartbeats"][role] = time.time()
+
+def publish_snapshot(activo, indicators):
+    """Publica los últimos indicadores calculados para el activo."""
+    if _channel is None:
+        return
+    _channel["snapshots"][activo] = {"ts": time.time(), "indicators": dict(indicators)}
+
+def get_snapshot(activo, max_age):
+    """
+    Devuelve los indicadores publicados para el activo si tienen menos de 'max_age' segundos,
+    o None si no hay snapshot reciente.
+    """
+    if _channel is None:
+        return None
+    snapshot = _channel["snapshots"].get(activo)
+    if not snapshot or time.time() - snapshot["ts"] > max_age:
+        return None
+    return snapshot["indicators"]
+
+def publish_candles(coin_id, buf):
+    """Publica una copia de las velas del stream de la moneda para el resto de procesos."""
+    if _channel is None:
+        return
+    timestamps, ohlcv = buf.snapshot()
+    _channel["candles"][coin_id] = {"ts": time.time(), "timestamps": timestamps, "ohlcv": ohlcv,
+                                    "interval_ms": buf.interval_ms}
+
+def get_candles(coin_id, max_age):
+    """
+    Devuelve un CandleBuffer con las velas publicadas para la moneda si tienen menos de
+    'max_age' segundos, o None si no hay publicación reciente.
+    """
+    if _channel is None:
+        return None
+    entry = _channel["candles"].get(coin_id)
+    if not entry or time.time() - entry["ts"] > max_age:
+        return None
+    return CandleBuffer.from_arrays(entry["timestamps"], entry["ohlcv"], entry["interval_ms"])
+
+def render_queue():
+    """Cola de trabajos de gráficos (None en modo hilos)."""
+    if _channel is None:
+        return None
+    return _channel["render_queue"]
+
+def submit_render(chat_id, timeframe_input="1h", chart_type="line", days=14):
+    """
+    Encola un gráfico para el rol renderer. Retorna False si no hay canal
+    (modo hilos), en cuyo caso el llamador debe renderizar en su propio proceso.
+    """
+    if _channel is None:
+        return False
+    _channel["render_queue"].put({
+        "chat_id": chat_id,
+        "timeframe_input": timeframe_input,
+        "chart_type": chart_type,
+        "days": days
+    })
+    return True
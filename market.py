@@ -1,8 +1,14 @@
 from datetime import datetime, timedelta
+import os
+import glob
 import time
+import threading
 import requests
+import numpy as np
 import pandas as pd
-from config import COINGECKO_COIN_ID, COINGECKO_API_KEY, MAX_RETRIES
+from config import (COINGECKO_COIN_ID, COINGECKO_API_KEY, MAX_RETRIES, WATCHLIST, PRICE_CACHE_TTL, CANDLE_CAPACITY,
+                    CANDLE_HISTORY_DIR)
+from candles import CandleBuffer, interval_to_ms
 
 # Diccionario para mapear símbolos cortos a IDs oficiales de CoinGecko
 COIN_ID_MAP = {
@@ -11,34 +17,127 @@ COIN_ID_MAP = {
     # Agrega otros mapeos si es necesario.
 }
 
-def fetch_data(symbol=None, timeframe="1h", days=14, **kwargs):
+# Tabla de precios en memoria: { coin_id: {"price": float, "change_24h": float} }
+_price_table = {}
+_price_table_ts = 0.0
+_price_lock = threading.Lock()
+# Monedas que /simple/price no devolvió: { coin_id: timestamp del último intento }
+_price_missing = {}
+
+# Historial de velas por moneda e intervalo: { (coin_id, intervalo): CandleBuffer }.
+# CoinGecko cambia el tamaño de vela según 'days', así que cada resolución tiene su buffer.
+_candle_store = {}
+_candle_lock = threading.Lock()
+
+# Antigüedad máxima (en intervalos) de la última vela para considerar un buffer actualizado
+STALE_INTERVALS = 1.5
+
+# Fuente de velas en vivo (ver stream.py): función coin_id -> CandleBuffer o None
+_stream_source = None
+_stream_coins = set()     # Monedas que cubre la fuente en vivo
+_stream_fallback = set()  # Monedas del stream que se están sirviendo desde CoinGecko
+
+def set_stream_source(source, coin_ids=()):
     """
-    Obtiene datos OHLC utilizando la API de CoinGecko.
-    
+    Registra una fuente de velas en vivo que fetch_candles consulta antes de CoinGecko.
+    'coin_ids' son las monedas que cubre, para avisar cuando alguna pasa a CoinGecko.
+    """
+    global _stream_source, _stream_coins
+    _stream_source = source
+    _stream_coins = set(coin_ids)
+
+def resolve_coin_id(symbol=None):
+    """
+    Convierte un símbolo corto o par (ej. "BNB/USDT", "btc") en el ID oficial de CoinGecko.
+    Si no se especifica, se utiliza COINGECKO_COIN_ID del config.
+    """
+    if symbol is None:
+        return COINGECKO_COIN_ID
+    # Si el símbolo contiene una barra (ej. "BNB/USDT"), se toma solo la parte anterior a la barra.
+    symbol = symbol.split('/')[0]
+    return COIN_ID_MAP.get(symbol.lower(), symbol.lower())
+
+# Valores de 'days' que acepta el endpoint /ohlc de CoinGecko
+OHLC_DAYS = (1, 7, 14, 30, 90, 180, 365)
+
+def ohlc_days(days):
+    """Menor valor de OHLC_DAYS que cubre 'days' (365 como máximo)."""
+    for valid in OHLC_DAYS:
+        if days <= valid:
+            return valid
+    return OHLC_DAYS[-1]
+
+def ohlc_interval(days):
+    """
+    Intervalo de las velas que devuelve el endpoint /ohlc de CoinGecko para 'days':
+    30 minutos hasta 2 días, 4 horas hasta 30 días y 4 días a partir de ahí.
+    """
+    if days <= 2:
+        return "30m"
+    if days <= 30:
+        return "4h"
+    return "4d"
+
+def fetch_candles(symbol=None, timeframe="1h", days=14, **kwargs):
+    """
+    Obtiene datos OHLC utilizando la API de CoinGecko y los incorpora al CandleBuffer
+    persistente de la moneda para ese intervalo (ver ohlc_interval). Se devuelve una copia
+    tomada bajo el lock del buffer, que el llamador puede leer sin competir con otros hilos.
+    Si hay un stream websocket activo con datos recientes de la moneda, se usan sus velas
+    sin consultar la API.
+
     Parámetros:
-      - symbol: ID o símbolo corto de la moneda en CoinGecko (ej. "bitcoin", "bnb", etc.). 
+      - symbol: ID o símbolo corto de la moneda en CoinGecko (ej. "bitcoin", "bnb", etc.).
                 Si no se especifica, se utiliza COINGECKO_COIN_ID del config.
       - timeframe: Intervalo de tiempo de las velas (ej. "1h"). Actualmente no se utiliza para modificar la consulta,
                    ya que CoinGecko determina el intervalo en función del parámetro "days".
-      - days: Número de días de datos a obtener. Por defecto se solicitan 14 días.
+      - days: Número de días de datos a obtener. Por defecto se solicitan 14 días. Se ajusta
+              al valor admitido por CoinGecko que lo cubre (ver ohlc_days).
       - **kwargs: Parámetros extra que se ignoran (por ejemplo, 'limit' usado por PrintGraphic).
-      
+
     Se envía la API key en el header.
     """
-    if symbol is not None:
-        # Si el símbolo contiene una barra (ej. "BNB/USDT"), se toma solo la parte anterior a la barra.
-        symbol = symbol.split('/')[0]
-        coin_id = COIN_ID_MAP.get(symbol.lower(), symbol.lower())
-    else:
-        coin_id = COINGECKO_COIN_ID
+    coin_id = resolve_coin_id(symbol)
+    days = ohlc_days(days)
+    buf = _live_candles(coin_id, days)
+    if buf is not None:
+        return buf
+    interval = _download_candles(coin_id, days)
+    with _candle_lock:
+        buf = _candle_store[(coin_id, interval)]
+    return buf.copy()
 
+def _live_candles(coin_id, days):
+    """
+    Velas del stream para la moneda (copia propia) o None si no hay datos recientes.
+    Avisa cuando una moneda del stream pasa a CoinGecko y cuando se recupera.
+    """
+    if _stream_source is None:
+        return None
+    buf = _stream_source(coin_id)
+    if buf is not None and len(buf) >= 2:
+        if coin_id in _stream_fallback:
+            _stream_fallback.discard(coin_id)
+            print(f"[INFO] Stream recuperado para {coin_id}; se vuelven a usar sus velas.")
+        return buf
+    if coin_id in _stream_coins and coin_id not in _stream_fallback:
+        _stream_fallback.add(coin_id)
+        print(f"[INFO] Stream sin datos recientes para {coin_id}; se usan velas de CoinGecko "
+              f"({ohlc_interval(days)}) hasta que se recupere.")
+    return None
+
+def _download_candles(coin_id, days):
+    """
+    Descarga de /ohlc las velas de 'days' días (valor admitido por CoinGecko) y las incorpora
+    al buffer persistente de la moneda. Retorna el intervalo del buffer actualizado.
+    """
     url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/ohlc"
     params = {
         "vs_currency": "usd",
         "days": days
     }
     headers = {"x_cg_pro_api_key": COINGECKO_API_KEY}
-    
+
     retries = 0
     while retries < MAX_RETRIES:
         try:
@@ -49,33 +148,209 @@ def fetch_data(symbol=None, timeframe="1h", days=14, **kwargs):
                 time.sleep(10)
             response.raise_for_status()  # Levanta error si no es 200
             data = response.json()
-            if not data or len(data) == 0:
-                raise ValueError("La respuesta de la API está vacía.")
-            df = pd.DataFrame(data, columns=['timestamp', 'open', 'high', 'low', 'close'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            if df.empty or len(df) < 2:
+            if not data or len(data) < 2:
                 raise ValueError("Datos insuficientes devueltos por la API.")
-            df['volume'] = 0  # La API no proporciona volumen
-            print(f"[INFO] Se obtuvieron {len(df)} registros de OHLC para {coin_id}.")
-            return df
+            interval = ohlc_interval(days)
+            with _candle_lock:
+                buf = _candle_store.get((coin_id, interval))
+                if buf is None:
+                    buf = _candle_store[(coin_id, interval)] = CandleBuffer(
+                        max(CANDLE_CAPACITY, len(data)), interval_to_ms(interval))
+                buf.merge(data)  # La API no proporciona volumen: queda en 0
+            print(f"[INFO] Se obtuvieron {len(data)} registros de OHLC ({interval}) para {coin_id}.")
+            return interval
         except Exception as e:
             print(f"[Error] {e}. Reintentando... ({retries + 1}/{MAX_RETRIES})")
             retries += 1
             time.sleep(5)
     raise Exception("No se pudieron obtener datos tras varios intentos.")
 
+def candle_frame(coin_id, interval, n=None, since=None, index=False):
+    """
+    DataFrame de las últimas n velas (o de las posteriores a 'since', en ms) del buffer
+    compartido de la moneda e intervalo, construido con una única copia tomada bajo su lock.
+    Retorna None si no hay buffer.
+    """
+    with _candle_lock:
+        buf = _candle_store.get((coin_id, interval))
+    if buf is None:
+        return None
+    return buf.to_dataframe(n, index=index, since=since)
+
+def fetch_frame(symbol=None, timeframe="1h", days=14, index=False, **kwargs):
+    """
+    Obtiene las velas de los últimos 'days' días como DataFrame (ver CandleBuffer.to_dataframe),
+    sin copiar el buffer: indicadores y gráficos leen directamente del historial compartido.
+    Usa el stream si tiene datos recientes de la moneda; si no, CoinGecko (ver fetch_candles).
+    Si index=True, 'timestamp' se usa como DatetimeIndex (formato que espera mplfinance).
+    """
+    coin_id = resolve_coin_id(symbol)
+    since = int((time.time() - days * 86400) * 1000)
+    buf = _live_candles(coin_id, ohlc_days(days))
+    if buf is not None:
+        return buf.to_dataframe(index=index, since=since)
+    interval = _download_candles(coin_id, ohlc_days(days))
+    return candle_frame(coin_id, interval, since=since, index=index)
+
+def is_fresh(buf, max_intervals):
+    """True si la última vela del buffer tiene menos de 'max_intervals' intervalos de antigüedad."""
+    if buf.interval_ms is None or not len(buf):
+        return False
+    return time.time() * 1000 - buf.last_timestamp <= max_intervals * buf.interval_ms
+
+def cached_candles(symbols, days=14, max_intervals=None):
+    """
+    Devuelve { coin_id: CandleBuffer } con copias de los buffers ya cargados de las monedas
+    indicadas (stream o historial de CoinGecko del intervalo que corresponde a 'days'),
+    sin hacer nuevas peticiones. Si se indica 'max_intervals', se omiten los buffers cuya
+    última vela es más antigua que ese número de intervalos (ver is_fresh).
+    """
+    interval = ohlc_interval(days)
+    buffers = {}
+    for symbol in symbols:
+        coin_id = resolve_coin_id(symbol)
+        buf = _stream_source(coin_id) if _stream_source is not None else None
+        if buf is None:
+            with _candle_lock:
+                stored = _candle_store.get((coin_id, interval))
+            buf = stored.copy() if stored is not None else None
+        if buf is None or not len(buf):
+            continue
+        if max_intervals is None or is_fresh(buf, max_intervals):
+            buffers[coin_id] = buf
+    return buffers
+
+def watchlist_candles(symbols=WATCHLIST, days=14, max_intervals=STALE_INTERVALS):
+    """
+    Velas recientes de todas las monedas indicadas: reutiliza las que siguen frescas en memoria
+    y descarga el resto con fetch_candles. Las monedas que no se pudieron obtener o que siguen
+    sin velas recientes se omiten. Retorna { coin_id: CandleBuffer }.
+    """
+    buffers = cached_candles(symbols, days, max_intervals)
+    for symbol in symbols:
+        coin_id = resolve_coin_id(symbol)
+        if coin_id in buffers:
+            continue
+        try:
+            buf = fetch_candles(coin_id, days=days)
+        except Exception as e:
+            print(f"[Error] No se pudieron obtener velas para {coin_id}: {e}")
+            continue
+        if is_fresh(buf, max_intervals):
+            buffers[coin_id] = buf
+        else:
+            print(f"[INFO] Las velas de {coin_id} no están actualizadas; se omite.")
+    return buffers
+
+def _history_path(coin_id, interval_ms, directory):
+    return os.path.join(directory, f"{coin_id}-{interval_ms // 60000}m.npz")
+
+def persist_candles(buffers, directory=CANDLE_HISTORY_DIR):
+    """
+    Acumula en disco las velas de { coin_id: CandleBuffer }, un archivo .npz por moneda e
+    intervalo. Las velas ya guardadas se conservan (el buffer en memoria descarta las antiguas)
+    y las que coinciden en timestamp se sustituyen por las nuevas.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for coin_id, buf in buffers.items():
+        if buf.interval_ms is None or not len(buf):
+            continue
+        timestamps, ohlcv = buf.snapshot()
+        path = _history_path(coin_id, buf.interval_ms, directory)
+        if os.path.exists(path):
+            with np.load(path) as stored:
+                old = stored["timestamps"] < timestamps[0]
+                timestamps = np.concatenate([stored["timestamps"][old], timestamps])
+                ohlcv = np.concatenate([stored["ohlcv"][:, old], ohlcv], axis=1)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, timestamps=timestamps, ohlcv=ohlcv)
+        os.replace(tmp, path)
+
+def load_candle_history(interval_ms, directory=CANDLE_HISTORY_DIR):
+    """Carga { coin_id: CandleBuffer } con todo el historial guardado del intervalo indicado."""
+    buffers = {}
+    suffix = f"-{interval_ms // 60000}m.npz"
+    for path in glob.glob(os.path.join(directory, "*" + suffix)):
+        coin_id = os.path.basename(path)[:-len(suffix)]
+        with np.load(path) as stored:
+            buffers[coin_id] = CandleBuffer.from_arrays(stored["timestamps"], stored["ohlcv"], interval_ms)
+    return buffers
+
+def fetch_data(symbol=None, timeframe="1h", days=14, **kwargs):
+    """
+    Obtiene datos OHLC utilizando fetch_frame y los devuelve como DataFrame con las columnas
+    timestamp, open, high, low, close y volume (volumen en 0 con CoinGecko, que no lo proporciona).
+    Solo se incluyen las velas del rango solicitado, aunque el buffer retenga más historial.
+    """
+    return fetch_frame(symbol, timeframe, days)
+
 def fetch_btc_price():
     """
-    Obtiene el precio actual de BTC en USD usando CoinGecko.
+    Obtiene el precio actual de BTC en USD desde la tabla de precios compartida.
+    """
+    return get_ticker("btc")["price"]
+
+def fetch_prices(coin_ids=None):
+    """
+    Obtiene en una sola petición a /simple/price el precio en USD y la variación de 24h
+    de todas las monedas indicadas (por defecto, las de WATCHLIST).
+    Retorna un diccionario { coin_id: {"price": float, "change_24h": float} }.
     """
+    if coin_ids is None:
+        coin_ids = WATCHLIST
+    ids = sorted({resolve_coin_id(c) for c in coin_ids})
     url = "https://api.coingecko.com/api/v3/simple/price"
-    params = {"ids": "bitcoin", "vs_currencies": "usd"}
-    response = requests.get(url, params=params)
+    params = {
+        "ids": ",".join(ids),
+        "vs_currencies": "usd",
+        "include_24hr_change": "true"
+    }
+    headers = {"x_cg_pro_api_key": COINGECKO_API_KEY}
+    response = requests.get(url, params=params, headers=headers)
     response.raise_for_status()
     data = response.json()
-    if "bitcoin" not in data:
-        raise Exception("Error obteniendo el precio de BTC.")
-    return data["bitcoin"]["usd"]
+    prices = {}
+    for coin_id in ids:
+        entry = data.get(coin_id)
+        if not entry or "usd" not in entry:
+            continue
+        prices[coin_id] = {
+            "price": entry["usd"],
+            "change_24h": entry.get("usd_24h_change")
+        }
+    return prices
+
+def get_ticker(symbol=None, max_age=PRICE_CACHE_TTL):
+    """
+    Devuelve {"price": float, "change_24h": float} para la moneda indicada desde la tabla
+    de precios en memoria. Si la tabla tiene más de 'max_age' segundos o la moneda no está
+    en ella, se refresca toda la lista de seguimiento con una única petición.
+    Las monedas que la API no devolvió se recuerdan durante 'max_age' segundos para no
+    repetir la petición en cada consulta.
+    """
+    global _price_table, _price_table_ts
+    coin_id = resolve_coin_id(symbol)
+    now = time.time()
+    with _price_lock:
+        fresh = (now - _price_table_ts) < max_age
+        ticker = _price_table.get(coin_id)
+        if fresh and ticker is not None:
+            return ticker
+        if fresh and now - _price_missing.get(coin_id, 0) < max_age:
+            raise Exception(f"Precio no disponible para {coin_id}.")
+        universe = set(resolve_coin_id(c) for c in WATCHLIST) | set(_price_table) | {coin_id}
+
+    # La petición se hace fuera del lock para no bloquear a los lectores de la tabla
+    prices = fetch_prices(universe)
+    with _price_lock:
+        _price_table = prices
+        _price_table_ts = time.time()
+        for missing in universe - set(prices):
+            _price_missing[missing] = _price_table_ts
+        ticker = _price_table.get(coin_id)
+    if ticker is None:
+        raise Exception(f"Precio no disponible para {coin_id}.")
+    return ticker
 
 def fetch_historical_data(symbol=None, timeframe="1h", days=14, **kwargs):
     """
@@ -1,13 +1,25 @@
+import os
+import time
+import logging
+import numpy as np
+import xgboost as xgb
 from indicators import calculate_indicators_for_bnb as calculate_indicators, check_cross_signals
+from market import load_candle_history, ohlc_interval
+from candles import OHLCV_COLUMNS, interval_to_ms
+from screener import align_columns, group_by_interval, rolling_mean, rolling_std, BB_WINDOW, BB_DEV
+from config import (feature_columns, TIMEFRAME, DATA_SOURCE, ML_MODEL_PATH,
+                    ML_LATENCY_TARGET_MS, ML_HORIZON)
 
-def aggregate_signals(data):
+def aggregate_signals(data, indicators=None):
     """
     Agrega señales basadas en los indicadores técnicos:
       - Señal de entrada si el precio cruza por encima de la banda superior de Bollinger con convergencia.
       - Golden Cross o Death Cross en SMAs de 10, 25 y 50.
+    Si ya se calcularon los indicadores de 'data', se pueden pasar en 'indicators'.
     Retorna un mensaje con las señales detectadas (si las hay).
     """
-    indicators = calculate_indicators(data)
+    if indicators is None:
+        indicators = calculate_indicators(data)
     message = ""
     price = indicators['price']
     bb_high = indicators['bb_high']
@@ -24,3 +36,106 @@ def aggregate_signals(data):
         message += "Death Cross detectado en SMA (10, 25, 50).\n"
     
     return message.strip()
+
+# --- Puntuación con XGBoost ---
+
+_booster = None
+
+def build_feature_matrix(buffers, bars=1):
+    """
+    Construye en un solo paso vectorizado la matriz de características (config.feature_columns)
+    de las últimas 'bars' velas de todas las monedas (todas las velas si bars es None).
+    Retorna (coins, timestamps, X) con X de forma (len(coins) * bars, len(feature_columns)),
+    ordenada por moneda y, dentro de cada moneda, por tiempo.
+    """
+    coins, grid, columns = align_columns(buffers, OHLCV_COLUMNS)
+    close = columns['close']
+    bb_medium = rolling_mean(close, BB_WINDOW)
+    bb_std = rolling_std(close, BB_WINDOW)
+    columns.update({
+        'sma_25': rolling_mean(close, 25),
+        'bb_low': bb_medium - BB_DEV * bb_std,
+        'bb_medium': bb_medium,
+        'bb_high': bb_medium + BB_DEV * bb_std
+    })
+    bars = len(grid) if bars is None else min(bars, len(grid))
+    features = np.stack([columns[name][:, -bars:] for name in feature_columns], axis=-1)
+    return coins, grid[-bars:], features.reshape(-1, len(feature_columns)).astype(np.float32)
+
+def scoring_interval_ms():
+    """
+    Intervalo (ms) de las velas que puntúa el monitor: TIMEFRAME con el stream websocket,
+    o el de CoinGecko para el rango por defecto de 14 días (4h).
+    """
+    return interval_to_ms(TIMEFRAME if DATA_SOURCE == "stream" else ohlc_interval(14))
+
+def load_model(path=ML_MODEL_PATH):
+    """
+    Carga el booster entrenado una sola vez por proceso. Retorna None (y las puntuaciones
+    quedan desactivadas) si el archivo no existe.
+    """
+    global _booster
+    if _booster is None:
+        if not os.path.exists(path):
+            logging.info("Modelo XGBoost no encontrado en %s; puntuación desactivada.", path)
+            return None
+        _booster = xgb.Booster()
+        _booster.load_model(path)
+        logging.info("Modelo XGBoost cargado desde %s.", path)
+    return _booster
+
+def score_universe(buffers, bars=1):
+    """
+    Puntúa todas las monedas con una predicción por lotes (una por intervalo de velas)
+    sobre el booster cargado. Si el modelo indica con qué intervalo se entrenó, solo se
+    puntúan las monedas con velas de ese intervalo.
+    Retorna { coin_id: probabilidad de la última vela } (vacío si no hay modelo o datos).
+    """
+    booster = load_model()
+    if booster is None or not buffers:
+        return {}
+    trained_ms = booster.attr("interval_ms")
+    start = time.perf_counter()
+    result = {}
+    for interval_ms, group in group_by_interval(buffers).items():
+        if trained_ms is not None and interval_ms != int(trained_ms):
+            continue
+        coins, _, X = build_feature_matrix(group, bars)
+        scores = booster.inplace_predict(X).reshape(len(coins), -1)
+        result.update({coin: float(scores[row, -1]) for row, coin in enumerate(coins)})
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if elapsed_ms > ML_LATENCY_TARGET_MS:
+        logging.warning("Puntuación de %d monedas: %.1f ms (objetivo %.0f ms).", len(result), elapsed_ms, ML_LATENCY_TARGET_MS)
+    return result
+
+def train_model(interval_ms=None, horizon=ML_HORIZON, path=ML_MODEL_PATH, rounds=200):
+    """
+    Entrenamiento offline sobre el historial de velas guardado por el monitor
+    (ver market.persist_candles), con el mismo intervalo que se puntúa en vivo
+    (por defecto, scoring_interval_ms()).
+    Etiqueta: 1 si el cierre 'horizon' velas después es mayor que el actual.
+    Guarda el booster en 'path' (formato JSON de XGBoost), con el intervalo y el horizonte
+    como atributos, y lo retorna.
+    """
+    if interval_ms is None:
+        interval_ms = scoring_interval_ms()
+    buffers = load_candle_history(interval_ms)
+    if not buffers:
+        raise ValueError(f"No hay historial de velas de {interval_ms // 60000} minutos para entrenar.")
+    coins, timestamps, X = build_feature_matrix(buffers, bars=None)
+    close = X[:, feature_columns.index('close')].reshape(len(coins), len(timestamps))
+    future = np.full(close.shape, np.nan, dtype=np.float32)
+    future[:, :-horizon] = close[:, horizon:]
+    labels = (future > close).astype(np.float32).reshape(-1)
+    usable = ~np.isnan(future).reshape(-1) & ~np.isnan(close).reshape(-1)
+    dtrain = xgb.DMatrix(X[usable], label=labels[usable], feature_names=feature_columns)
+    params = {"objective": "binary:logistic", "eval_metric": "logloss", "max_depth": 4, "eta": 0.05}
+    booster = xgb.train(params, dtrain, num_boost_round=rounds)
+    booster.set_attr(interval_ms=str(interval_ms), horizon=str(horizon))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    booster.save_model(path)
+    print(f"[INFO] Modelo entrenado con {int(usable.sum())} filas y guardado en {path}.")
+    return booster
+
+if __name__ == "__main__":
+    train_model()
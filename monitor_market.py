@@ -1,10 +1,13 @@
 import time
 import logging
-from market import fetch_data, fetch_btc_price, fetch_historical_data
+from market import fetch_data, fetch_btc_price, fetch_historical_data, watchlist_candles, persist_candles
 from indicators import fetch_btc_dominance
-from ml_model import aggregate_signals
+from indicators import calculate_indicators_for_bnb
+from ml_model import aggregate_signals, load_model, score_universe
+from screener import evaluate_buffers
+import ipc
 from telegram_handler import send_telegram_message
-from config import TIMEFRAME
+from config import TIMEFRAME, WATCHLIST, WATCHLIST_SNAPSHOT, ML_SIGNAL_THRESHOLD
 import pandas as pd
 
 logging.basicConfig(
@@ -23,12 +26,16 @@ def monitor_market():
     logging.info("Iniciando monitoreo del mercado con la nueva estrategia (cada 5 minutos)...")
     last_btc_dominance = None
     last_btc_price = None
+    load_model()  # El booster se carga una sola vez al iniciar
 
     while True:
         try:
             # Monitoreo para BNB
+            ipc.heartbeat()
             data_bnb = fetch_data("bnb", TIMEFRAME)
-            signal_message = aggregate_signals(data_bnb)
+            bnb_indicators = calculate_indicators_for_bnb(data_bnb)
+            ipc.publish_snapshot("BNB", bnb_indicators)
+            signal_message = aggregate_signals(data_bnb, bnb_indicators)
             if signal_message:
                 msg = "Señales detectadas:\n" + signal_message
                 send_telegram_message(msg)
@@ -38,6 +45,7 @@ def monitor_market():
 
             # Monitoreo para BTC utilizando get_btc_indicators()
             btc_indicators = get_btc_indicators()
+            ipc.publish_snapshot("BTC", btc_indicators)
             btc_price = btc_indicators['price']
             btc_dominance = btc_indicators['dominance']
             if last_btc_dominance is not None and last_btc_price is not None:
@@ -51,9 +59,24 @@ def monitor_market():
             last_btc_dominance = btc_dominance
             last_btc_price = btc_price
 
+            # Puntuación XGBoost por lotes sobre las velas recientes de toda la lista de seguimiento
+            # (se descargan las que faltan o están desactualizadas), que se acumulan en disco como
+            # historial de entrenamiento (python ml_model.py)
+            buffers = watchlist_candles(WATCHLIST)
+            persist_candles(buffers)
+            # Señales del screener para las intenciones "ranking" y "squeeze" del bot
+            ipc.publish_snapshot(WATCHLIST_SNAPSHOT, evaluate_buffers(buffers))
+            scores = score_universe(buffers)
+            strong = {coin: score for coin, score in scores.items() if score >= ML_SIGNAL_THRESHOLD}
+            if strong:
+                lines = [f"• {coin}: {score:.0%}" for coin, score in sorted(strong.items(), key=lambda item: -item[1])]
+                send_telegram_message("🤖 Modelo: probabilidad alcista elevada\n" + "\n".join(lines))
+                logging.info("Señales del modelo enviadas a Telegram.")
+
             time.sleep(300)  # Espera 5 minutos
         except Exception as e:
             logging.error("Error en monitor_market: %s", e)
+            ipc.heartbeat()
             time.sleep(60)
 
 if __name__ == "__main__":
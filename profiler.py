@@ -0,0 +1,120 @@
+import os
+import sys
+import glob
+import time
+import signal
+import threading
+from collections import Counter
+import ipc
+from config import PROFILER_ENABLED, PROFILER_INTERVAL_MS, PROFILER_FLUSH_SECONDS, PROFILER_DIR, PROFILER_KEEP
+
+# Archivos y paquetes cuya presencia en la pila indica trabajo de renderizado de gráficos.
+# Se comparan con la ruta completa del código (co_filename), no con la etiqueta.
+RENDER_FILES = ("PrintGraphic.py",)
+RENDER_PACKAGES = ("mplfinance", "matplotlib")
+
+_samples = Counter()
+_lock = threading.Lock()
+_thread = None
+_flush_count = 0
+
+# Etiqueta y si es código de gráficos, por objeto code: cada muestra solo hace búsquedas
+_code_info = {}
+
+def _is_render_file(filename):
+    parts = os.path.normpath(filename).split(os.sep)
+    return parts[-1] in RENDER_FILES or any(part in RENDER_PACKAGES for part in parts[:-1])
+
+def _code_entry(code):
+    entry = _code_info.get(code)
+    if entry is None:
+        label = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        entry = _code_info[code] = (label, _is_render_file(code.co_filename))
+    return entry
+
+def _role_for(thread_name, render):
+    """
+    Atribuye una muestra a un rol: en modo multiproceso, el del proceso; en modo hilos,
+    el nombre del hilo ("monitor", "bot"). Las pilas que pasan por el código de gráficos
+    se atribuyen a "renderer".
+    """
+    if render:
+        return "renderer"
+    return ipc.current_role() or thread_name
+
+def sample_once():
+    """Toma una muestra de la pila de todos los hilos (excepto el del profiler)."""
+    names = {t.ident: t.name for t in threading.enumerate()}
+    own = threading.get_ident()
+    stacks = []
+    for ident, frame in sys._current_frames().items():
+        if ident == own:
+            continue
+        labels = []
+        render = False
+        while frame is not None:
+            label, is_render = _code_entry(frame.f_code)
+            labels.append(label)
+            render = render or is_render
+            frame = frame.f_back
+        labels.reverse()
+        role = _role_for(names.get(ident, str(ident)), render)
+        stacks.append(";".join([role] + labels))
+    with _lock:
+        _samples.update(stacks)
+
+def flush():
+    """
+    Escribe las muestras acumuladas en formato collapsed-stack ("pila;apilada conteo"),
+    compatible con flamegraph.pl y speedscope, y conserva solo los últimos PROFILER_KEEP archivos
+    del rol del proceso. La limpieza abarca todos los PID del rol, ya que el supervisor
+    reinicia los roles en procesos nuevos.
+    """
+    global _samples, _flush_count
+    with _lock:
+        samples, _samples = _samples, Counter()
+        _flush_count += 1
+        seq = _flush_count
+    if not samples:
+        return None
+    os.makedirs(PROFILER_DIR, exist_ok=True)
+    role = ipc.current_role() or "main"
+    # El contador evita que un volcado por SIGUSR1 en el mismo segundo sobrescriba otro
+    path = os.path.join(PROFILER_DIR, f"higgs-{role}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}-{seq}.collapsed")
+    with open(path, "w") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+    files = sorted(glob.glob(os.path.join(PROFILER_DIR, f"higgs-{role}-*.collapsed")), key=os.path.getmtime)
+    for old in files[:-PROFILER_KEEP]:
+        try:
+            os.remove(old)
+        except FileNotFoundError:
+            pass
+    return path
+
+def _loop():
+    interval = PROFILER_INTERVAL_MS / 1000
+    next_flush = time.time() + PROFILER_FLUSH_SECONDS
+    while True:
+        time.sleep(interval)
+        try:
+            sample_once()
+            if time.time() >= next_flush:
+                flush()
+                next_flush = time.time() + PROFILER_FLUSH_SECONDS
+        except Exception as e:
+            print(f"[Error] En el profiler: {e}")
+
+def start():
+    """
+    Inicia el profiler de muestreo si PROFILER_ENABLED está activo. Los archivos se escriben
+    cada PROFILER_FLUSH_SECONDS segundos o al recibir SIGUSR1.
+    """
+    global _thread
+    if not PROFILER_ENABLED or _thread is not None:
+        return
+    _thread = threading.Thread(target=_loop, name="profiler", daemon=True)
+    _thread.start()
+    if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, lambda signum, frame: flush())
+    print(f"[INFO] Profiler de muestreo activo ({PROFILER_INTERVAL_MS} ms) en {PROFILER_DIR}.")
@@ -0,0 +1,117 @@
+from config import OPENAI_MODEL, OPENAI_FAST_MODEL, PROMPT_INPUT_BUDGET
+
+try:
+    import tiktoken
+except ImportError:  # Sin tiktoken se usa una estimación por caracteres (ver count_tokens)
+    tiktoken = None
+
+SYSTEM_PROMPT = (
+    "Eres Higgs, Agente X. Eres un experto en trading y un agente en la blockchain, tienes acceso a datos técnicos actualizados, "
+    "además del historial de conversación. Responde con el tono misterioso y profesional que te caracteriza. "
+    "Analiza la siguiente información y genera un análisis robusto que complemente los datos técnicos. "
+    "Si es necesario, complementa con tu conocimiento de mercado."
+)
+
+# Las peticiones de análisis (intención "analisis" de intent_router) usan el modelo principal.
+# Los seguimientos cortos de una respuesta anterior sin activo explícito, el modelo rápido.
+SHORT_QUESTION_WORDS = 12
+MAX_TOKENS_ANALYSIS = 500
+MAX_TOKENS_FAST = 200
+
+# Sobrecoste aproximado por mensaje en el formato de chat de OpenAI
+TOKENS_PER_MESSAGE = 4
+
+# Abreviaturas de los indicadores en el prompt compacto, en orden de aparición
+INDICATOR_FIELDS = [
+    ("price", "precio"), ("rsi", "rsi"), ("adx", "adx"), ("macd", "macd"), ("macd_signal", "macd_sig"),
+    ("sma_10", "sma10"), ("sma_25", "sma25"), ("sma_50", "sma50"),
+    ("bb_low", "bb_low"), ("bb_medium", "bb_mid"), ("bb_high", "bb_high"),
+    ("cmf", "cmf"), ("dominance", "dom%")
+]
+
+_encoding = None
+
+def count_tokens(text):
+    """
+    Cuenta los tokens de 'text' localmente con tiktoken (cl100k_base, la codificación de
+    gpt-4 y gpt-3.5-turbo). Si tiktoken no está instalado o no puede cargar la codificación,
+    se estima a ~4 caracteres por token.
+    """
+    global _encoding
+    if _encoding is None:
+        _encoding = False
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                print(f"[Error] No se pudo cargar tiktoken, se estimarán los tokens: {e}")
+    if not _encoding:
+        return len(text) // 4 + 1
+    return len(_encoding.encode(text))
+
+def format_indicators(activo, indicators):
+    """Serializa los indicadores en una sola línea 'clave=valor' omitiendo los que no existen."""
+    parts = []
+    for key, label in INDICATOR_FIELDS:
+        value = indicators.get(key)
+        if value is None:
+            continue
+        parts.append(f"{label}={value:.2f}" if isinstance(value, (int, float)) else f"{label}={value}")
+    return f"{activo}: " + " ".join(parts)
+
+def format_history(historial):
+    """Serializa el historial como líneas 'U:'/'A:' en lugar del repr de los diccionarios."""
+    prefix = {"user": "U", "assistant": "A"}
+    return "\n".join(f"{prefix.get(m['role'], m['role'])}: {m['content']}" for m in historial)
+
+def is_follow_up(ruta, question, historial):
+    """
+    True si la pregunta es un seguimiento corto de una respuesta anterior: no menciona activo
+    (se toma del contexto), tiene pocas palabras y el bot ya respondió en la conversación.
+    """
+    return (ruta.get("activo") is None
+            and len(question.split()) <= SHORT_QUESTION_WORDS
+            and any(message["role"] == "assistant" for message in historial))
+
+def choose_model(ruta, question, historial):
+    """
+    Elige (modelo, max_tokens) a partir de la clasificación de intent_router.route(): las
+    peticiones de análisis usan el modelo principal, salvo los seguimientos cortos
+    (ver is_follow_up), que usan el modelo rápido igual que el resto de consultas.
+    """
+    if ruta.get("intent") == "analisis" and not is_follow_up(ruta, question, historial):
+        return OPENAI_MODEL, MAX_TOKENS_ANALYSIS
+    return OPENAI_FAST_MODEL, MAX_TOKENS_FAST
+
+def build_analysis_request(activo, indicators, historial, question, ruta, budget=PROMPT_INPUT_BUDGET):
+    """
+    Construye los parámetros de openai.ChatCompletion.create para una consulta de análisis.
+    'ruta' es la clasificación del mensaje (intent_router.route) y decide el modelo.
+    El historial se recorta desde los mensajes más antiguos hasta que el prompt completo
+    cabe en 'budget' tokens de entrada. Retorna un dict con model, messages y max_tokens.
+    """
+    model, max_tokens = choose_model(ruta, question, historial)
+    # El último mensaje del historial suele ser la propia pregunta: no se duplica
+    if historial and historial[-1]["role"] == "user" and historial[-1]["content"] == question:
+        historial = historial[:-1]
+
+    data_text = f"Indicadores {format_indicators(activo, indicators)}\nPregunta: {question}"
+    used = count_tokens(SYSTEM_PROMPT) + count_tokens(data_text) + 2 * TOKENS_PER_MESSAGE
+
+    kept = []
+    for message in reversed(historial):
+        cost = count_tokens(format_history([message])) + 1
+        if used + cost > budget:
+            break
+        kept.insert(0, message)
+        used += cost
+
+    user_text = f"Historial:\n{format_history(kept)}\n{data_text}" if kept else data_text
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_text}
+        ],
+        "max_tokens": max_tokens
+    }
@@ -0,0 +1,218 @@
+import numpy as np
+from market import fetch_candles, resolve_coin_id
+
+# Mismos parámetros que indicators.py / ml_model.aggregate_signals
+SMA_WINDOWS = (10, 25, 50)
+BB_WINDOW = 20
+BB_DEV = 2
+RSI_WINDOW = 14
+SQUEEZE_THRESHOLD = 0.005  # Ancho de bandas relativo al precio por debajo del cual hay "squeeze"
+
+def group_by_interval(buffers):
+    """
+    Separa { coin_id: CandleBuffer } en { interval_ms: { coin_id: CandleBuffer } }, para
+    alinear y evaluar por separado las monedas con velas de distinto tamaño.
+    """
+    groups = {}
+    for coin, buf in buffers.items():
+        groups.setdefault(buf.interval_ms, {})[coin] = buf
+    return groups
+
+def align_columns(buffers, columns=('close',), length=None):
+    """
+    Alinea columnas OHLCV de varias monedas en matrices (monedas × tiempo).
+
+    - buffers: { coin_id: CandleBuffer }, todos con el mismo intervalo (ver group_by_interval).
+    - columns: columnas a alinear (ej. ('open', 'high', 'low', 'close', 'volume')).
+    - length: número de columnas (velas) a conservar; por defecto, todas.
+    La rejilla temporal es la unión de timestamps; los huecos dentro del rango de cada moneda
+    se rellenan con el último valor conocido y las velas anteriores a su primer dato o
+    posteriores a su última vela quedan en NaN (una moneda que dejó de actualizarse no
+    aparenta un precio plano).
+    Lanza ValueError si los buffers tienen intervalos distintos, porque la unión de rejillas
+    repetiría velas y sesgaría las ventanas de los indicadores.
+    Retorna (coins, timestamps, { columna: matriz }).
+    """
+    if len(group_by_interval(buffers)) > 1:
+        raise ValueError("No se pueden alinear velas de intervalos distintos.")
+    coins = list(buffers)
+    grid = np.unique(np.concatenate([buffers[c].timestamps() for c in coins]))
+    if length is not None:
+        grid = grid[-length:]
+    matrices = {name: np.full((len(coins), len(grid)), np.nan) for name in columns}
+    for row, coin in enumerate(coins):
+        buf = buffers[coin]
+        # Posición del último valor con timestamp <= cada punto de la rejilla (forward-fill)
+        timestamps = buf.timestamps()
+        pos = np.searchsorted(timestamps, grid, side="right") - 1
+        known = (pos >= 0) & (grid <= timestamps[-1])
+        for name in columns:
+            matrices[name][row, known] = buf.column(name)[pos[known]]
+    return coins, grid, matrices
+
+def align_closes(buffers, length=None):
+    """Atajo de align_columns para los cierres. Retorna (coins, timestamps, matriz)."""
+    coins, grid, matrices = align_columns(buffers, ('close',), length)
+    return coins, grid, matrices['close']
+
+def _window_sum(matrix, window):
+    """Suma móvil por filas a partir de sumas acumuladas: O(monedas × tiempo) en memoria."""
+    acc = np.zeros((matrix.shape[0], matrix.shape[1] + 1))
+    np.cumsum(matrix, axis=1, out=acc[:, 1:])
+    return acc[:, window:] - acc[:, :-window]
+
+def _window_moments(matrix, window):
+    """
+    Media y varianza (ddof=0) de cada ventana completa, o (None, None) si no hay ninguna.
+    Las ventanas con algún NaN quedan en NaN. Los valores se centran en la media de cada fila
+    antes de acumular para que la diferencia de sumas de cuadrados no pierda precisión.
+    """
+    if matrix.shape[1] < window:
+        return None, None
+    valid = ~np.isnan(matrix)
+    with np.errstate(invalid="ignore"):
+        center = np.nan_to_num(np.nanmean(np.where(valid, matrix, np.nan), axis=1, keepdims=True))
+    x = np.where(valid, matrix - center, 0.0)
+    complete = _window_sum(valid.astype(np.float64), window) == window
+    mean = _window_sum(x, window) / window
+    var = np.maximum(_window_sum(x * x, window) / window - mean * mean, 0.0)
+    mean[~complete] = np.nan
+    var[~complete] = np.nan
+    return mean + center, var
+
+def rolling_mean(matrix, window):
+    """Media móvil por filas; NaN hasta completar la ventana (como Series.rolling(window).mean())."""
+    out = np.full(matrix.shape, np.nan)
+    mean, _ = _window_moments(matrix, window)
+    if mean is not None:
+        out[:, window - 1:] = mean
+    return out
+
+def rolling_std(matrix, window):
+    """Desviación estándar móvil por filas (ddof=0, igual que ta.BollingerBands)."""
+    out = np.full(matrix.shape, np.nan)
+    _, var = _window_moments(matrix, window)
+    if var is not None:
+        out[:, window - 1:] = np.sqrt(var)
+    return out
+
+def rsi(matrix, window=RSI_WINDOW):
+    """
+    RSI de Wilder por filas, equivalente a ta.momentum.RSIIndicator: medias exponenciales
+    con alpha=1/window (adjust=False) de subidas y bajadas. La recursión avanza en el tiempo
+    pero cada paso se calcula para todas las monedas a la vez.
+    """
+    diff = np.diff(matrix, axis=1, prepend=np.nan)
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    alpha = 1 / window
+    ema_up = np.empty(matrix.shape)
+    ema_down = np.empty(matrix.shape)
+    ema_up[:, 0] = up[:, 0]
+    ema_down[:, 0] = down[:, 0]
+    for t in range(1, matrix.shape[1]):
+        ema_up[:, t] = (1 - alpha) * ema_up[:, t - 1] + alpha * up[:, t]
+        ema_down[:, t] = (1 - alpha) * ema_down[:, t - 1] + alpha * down[:, t]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(ema_down == 0, 100.0, 100 - 100 / (1 + ema_up / ema_down))
+    # Igual que min_periods=window: NaN hasta tener 'window' observaciones válidas,
+    # y NaN tras la última vela de cada moneda
+    valid = np.cumsum(~np.isnan(matrix), axis=1)
+    out[(valid < window) | np.isnan(matrix)] = np.nan
+    return out
+
+def _crossed_up(fast, slow):
+    prev = np.zeros(fast.shape, dtype=bool)
+    prev[:, 1:] = (fast[:, :-1] < slow[:, :-1]) & (fast[:, 1:] >= slow[:, 1:])
+    return prev
+
+def _crossed_down(fast, slow):
+    prev = np.zeros(fast.shape, dtype=bool)
+    prev[:, 1:] = (fast[:, :-1] > slow[:, :-1]) & (fast[:, 1:] <= slow[:, 1:])
+    return prev
+
+def compute_indicators(closes):
+    """
+    Calcula para toda la matriz de cierres (monedas × tiempo):
+      - SMAs (10, 25, 50), Bandas de Bollinger (20, 2) y RSI (14).
+      - golden_cross / death_cross: mismo criterio que indicators.check_cross_signals.
+      - squeeze: ancho de bandas menor que SQUEEZE_THRESHOLD × precio.
+      - squeeze_breakout: squeeze con el precio por encima de la banda superior
+        (señal de entrada de ml_model.aggregate_signals).
+    Retorna un diccionario de matrices con la misma forma que 'closes'.
+    """
+    sma = {w: rolling_mean(closes, w) for w in SMA_WINDOWS}
+    bb_medium = rolling_mean(closes, BB_WINDOW)
+    bb_std = rolling_std(closes, BB_WINDOW)
+    bb_high = bb_medium + BB_DEV * bb_std
+    bb_low = bb_medium - BB_DEV * bb_std
+    squeeze = (bb_high - bb_low) < SQUEEZE_THRESHOLD * closes
+    return {
+        'price': closes,
+        'rsi': rsi(closes),
+        'sma_10': sma[10],
+        'sma_25': sma[25],
+        'sma_50': sma[50],
+        'bb_low': bb_low,
+        'bb_medium': bb_medium,
+        'bb_high': bb_high,
+        'golden_cross': _crossed_up(sma[10], sma[25]) & _crossed_up(sma[25], sma[50]),
+        'death_cross': _crossed_down(sma[10], sma[25]) & _crossed_down(sma[25], sma[50]),
+        'squeeze': squeeze,
+        'squeeze_breakout': squeeze & (closes > bb_high)
+    }
+
+def latest_signals(coins, matrices):
+    """
+    Extrae la última columna de cada matriz como vector de señales por moneda.
+    Retorna { coin_id: {'price': ..., 'rsi': ..., 'golden_cross': bool, ...} } con None
+    en lugar de NaN, igual que los diccionarios de indicators.py.
+    """
+    signals = {}
+    for row, coin in enumerate(coins):
+        entry = {}
+        for key, matrix in matrices.items():
+            value = matrix[row, -1]
+            if matrix.dtype == bool:
+                entry[key] = bool(value)
+            else:
+                entry[key] = None if np.isnan(value) else float(value)
+        signals[coin] = entry
+    return signals
+
+def evaluate_universe(coins, timeframe="1h", days=14, length=None):
+    """
+    Obtiene las velas de todas las monedas indicadas, las alinea en una matriz y calcula
+    indicadores y señales para todas a la vez. Retorna { coin_id: señales } (ver latest_signals).
+    Las monedas cuyos datos no se pudieron obtener se omiten. Si hay velas de distintos
+    intervalos (ej. stream y CoinGecko), cada intervalo se evalúa por separado.
+    """
+    buffers = {}
+    for coin in coins:
+        coin_id = resolve_coin_id(coin)
+        try:
+            buffers[coin_id] = fetch_candles(coin_id, timeframe, days)
+        except Exception as e:
+            print(f"[Error] No se pudieron obtener velas para {coin_id}: {e}")
+    return evaluate_buffers(buffers, length)
+
+def evaluate_buffers(buffers, length=None):
+    """
+    Calcula indicadores y señales de { coin_id: CandleBuffer } ya cargados, evaluando por
+    separado cada intervalo de velas. Retorna { coin_id: señales } (ver latest_signals).
+    """
+    signals = {}
+    for group in group_by_interval(buffers).values():
+        coins, _, closes = align_closes(group, length)
+        signals.update(latest_signals(coins, compute_indicators(closes)))
+    return signals
+
+def top_by(signals, key, n=10, descending=True):
+    """Ranking de monedas por un indicador (ej. top_by(signals, 'rsi')). Omite valores None."""
+    ranked = [(coin, s[key]) for coin, s in signals.items() if s.get(key) is not None]
+    ranked.sort(key=lambda item: item[1], reverse=descending)
+    return ranked[:n]
+
+def screen(signals, flag):
+    """Monedas cuya señal booleana 'flag' está activa (ej. screen(signals, 'squeeze'))."""
+    return [coin for coin, s in signals.items() if s.get(flag)]
@@ -0,0 +1,163 @@
+import time
+import asyncio
+from urllib.parse import urlsplit
+import threading
+import logging
+import market
+import ipc
+from candles import CandleBuffer
+from config import (DATA_SOURCE, STREAM_EXCHANGE, STREAM_SYMBOLS, STREAM_WS_URL, STREAM_REST_URL, STREAM_MAX_AGE,
+                    STREAM_PUBLISH_INTERVAL, TIMEFRAME, CANDLE_CAPACITY)
+
+try:
+    import ccxt.pro as ccxtpro
+except ImportError:  # Versiones de ccxt sin soporte websocket
+    ccxtpro = None
+
+RECONNECT_DELAY = 2       # Segundos de espera inicial antes de reconectar
+MAX_RECONNECT_DELAY = 60  # Tope del backoff exponencial
+GAP_FILL_PAGE = 1000      # Velas por petición REST al rellenar huecos (máximo de Binance)
+
+# Velas recibidas por websocket: { coin_id: CandleBuffer }. Se mantienen separadas del
+# historial de CoinGecko porque el intervalo de las velas no coincide.
+_buffers = {}
+_last_update = {}
+_last_publish = {}
+_lock = threading.Lock()
+_thread = None
+
+def _merge(coin_id, rows):
+    with _lock:
+        buf = _buffers.get(coin_id)
+        if buf is None:
+            buf = _buffers[coin_id] = CandleBuffer(CANDLE_CAPACITY)
+        buf.merge(rows)
+        now = _last_update[coin_id] = time.time()
+        publish = now - _last_publish.get(coin_id, 0) >= STREAM_PUBLISH_INTERVAL
+        if publish:
+            _last_publish[coin_id] = now
+    if publish:
+        ipc.publish_candles(coin_id, buf)
+
+def get_stream_candles(coin_id):
+    """
+    Devuelve una copia del CandleBuffer alimentado por websocket para la moneda, o None si
+    no se está transmitiendo o los datos tienen más de STREAM_MAX_AGE segundos.
+    Se registra en market como fuente preferente de fetch_candles.
+    """
+    with _lock:
+        buf = _buffers.get(coin_id)
+        if buf is None or time.time() - _last_update.get(coin_id, 0) > STREAM_MAX_AGE:
+            return None
+        return buf.copy()
+
+def get_published_candles(coin_id):
+    """Fuente de velas de los procesos que no ingieren: lee las publicadas por el monitor."""
+    return ipc.get_candles(coin_id, STREAM_MAX_AGE)
+
+def create_exchange(ws_url=STREAM_WS_URL, rest_url=STREAM_REST_URL):
+    """
+    Crea el cliente websocket de ccxt. Si se indica 'ws_url' (ej. un servidor local de
+    pruebas como stream_standin.py), sustituye todas las URLs websocket del exchange; con
+    'rest_url' se sustituye el servidor de sus URLs REST (se conserva la ruta), de modo que la
+    carga de mercados y el relleno de huecos tampoco salen a internet.
+    """
+    exchange = getattr(ccxtpro, STREAM_EXCHANGE)({"enableRateLimit": True})
+    if ws_url:
+        urls = exchange.urls["api"]["ws"]
+        if isinstance(urls, dict):
+            exchange.urls["api"]["ws"] = {key: ws_url for key in urls}
+        else:
+            exchange.urls["api"]["ws"] = ws_url
+    if rest_url:
+        for key, url in exchange.urls["api"].items():
+            if isinstance(url, str) and url.startswith("http"):
+                exchange.urls["api"][key] = rest_url.rstrip("/") + urlsplit(url).path
+    return exchange
+
+def _last_timestamp(coin_id):
+    with _lock:
+        buf = _buffers.get(coin_id)
+        return buf.last_timestamp if buf is not None else None
+
+async def _gap_fill(exchange, symbol, coin_id, timeframe):
+    """
+    Recupera por REST las velas perdidas desde la última recibida (o las últimas
+    CANDLE_CAPACITY si el buffer está vacío), paginando de GAP_FILL_PAGE en GAP_FILL_PAGE
+    hasta alcanzar el presente para que un corte largo no deje huecos.
+    """
+    interval_ms = exchange.parse_timeframe(timeframe) * 1000
+    since = _last_timestamp(coin_id)
+    if since is None:
+        since = exchange.milliseconds() - CANDLE_CAPACITY * interval_ms
+    total = 0
+    while True:
+        rows = await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=GAP_FILL_PAGE)
+        if rows:
+            _merge(coin_id, rows)
+            total += len(rows)
+        if len(rows) < GAP_FILL_PAGE or rows[-1][0] <= since:
+            break
+        since = rows[-1][0]
+    if total:
+        logging.info("Stream %s: %d velas recuperadas por REST.", symbol, total)
+
+async def watch_symbol(exchange, symbol, timeframe=TIMEFRAME):
+    """
+    Suscribe el feed de velas del símbolo y las incorpora al buffer de la moneda.
+    Ante cualquier error se reconecta con backoff exponencial y rellena el hueco por REST.
+    Si llega una vela que no sigue a la última del buffer (velas perdidas sin desconexión),
+    también se rellena el hueco antes de incorporarla.
+    """
+    coin_id = market.resolve_coin_id(symbol)
+    interval_ms = exchange.parse_timeframe(timeframe) * 1000
+    delay = RECONNECT_DELAY
+    while True:
+        try:
+            await _gap_fill(exchange, symbol, coin_id, timeframe)
+            while True:
+                rows = await exchange.watch_ohlcv(symbol, timeframe)
+                last = _last_timestamp(coin_id)
+                if rows and last is not None and rows[0][0] > last + interval_ms:
+                    logging.warning("Stream %s: hueco de velas detectado, rellenando por REST.", symbol)
+                    await _gap_fill(exchange, symbol, coin_id, timeframe)
+                _merge(coin_id, rows)
+                delay = RECONNECT_DELAY
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error("Stream %s desconectado: %s. Reconectando en %ss...", symbol, e, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+async def run_stream(symbols=STREAM_SYMBOLS, timeframe=TIMEFRAME, ws_url=STREAM_WS_URL, rest_url=STREAM_REST_URL):
+    """Ejecuta un watcher por símbolo sobre una única conexión del exchange."""
+    exchange = create_exchange(ws_url, rest_url)
+    try:
+        await asyncio.gather(*(watch_symbol(exchange, symbol, timeframe) for symbol in symbols))
+    finally:
+        await exchange.close()
+
+def start(ingest=True):
+    """
+    Inicia la ingesta por websocket en un hilo propio (si DATA_SOURCE=stream) y registra el
+    stream como fuente de velas de market.fetch_candles. Retorna False si no se inició.
+    Con ingest=False (procesos distintos del monitor en modo multiproceso) no se abre
+    ninguna conexión: se registran como fuente las velas publicadas por el monitor.
+    """
+    global _thread
+    if DATA_SOURCE != "stream":
+        return False
+    coin_ids = [market.resolve_coin_id(symbol) for symbol in STREAM_SYMBOLS]
+    if not ingest:
+        market.set_stream_source(get_published_candles, coin_ids)
+        return True
+    if ccxtpro is None:
+        logging.error("ccxt.pro no está disponible; se continúa con datos REST de CoinGecko.")
+        return False
+    if _thread is None:
+        market.set_stream_source(get_stream_candles, coin_ids)
+        _thread = threading.Thread(target=lambda: asyncio.run(run_stream()), name="stream", daemon=True)
+        _thread.start()
+        logging.info("Stream de %s iniciado para %s (%s).", STREAM_EXCHANGE, ", ".join(STREAM_SYMBOLS), TIMEFRAME)
+    return True
@@ -0,0 +1,176 @@
+"""
+Servidor local que imita el subconjunto de Binance que usa stream.py, para probar la ingesta
+por websocket sin salir a internet:
+
+  - REST  GET .../exchangeInfo  mercados spot de los símbolos indicados (load_markets de ccxt).
+  - REST  GET /api/v3/klines    velas sintéticas deterministas (relleno de huecos).
+  - WS    /stream/...           SUBSCRIBE a "<par>@kline_<intervalo>" y eventos "kline" periódicos.
+
+Uso:
+  python stream_standin.py                    # sirve en 127.0.0.1:8765 hasta Ctrl+C
+  python stream_standin.py --check            # ejecuta stream.run_stream contra el servidor y
+                                              # verifica que el buffer queda completo y sin huecos
+Para usarlo con el bot: DATA_SOURCE=stream STREAM_WS_URL=ws://127.0.0.1:8765/stream/ws
+STREAM_REST_URL=http://127.0.0.1:8765
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+from aiohttp import web, WSMsgType
+
+HOST = "127.0.0.1"
+PORT = 8765
+SYMBOLS = ("BNB/USDT", "BTC/USDT")
+TICK_SECONDS = 0.2   # Cada cuánto se emite un evento kline por suscripción
+MAX_KLINES = 1000    # Límite por petición, igual que Binance
+
+INTERVAL_MS = {"1m": 60_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+               "1h": 3_600_000, "4h": 14_400_000, "1d": 86_400_000}
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+def synthetic_kline(market_id, interval, open_time):
+    """Vela determinista (mismo resultado para el mismo par, intervalo e instante)."""
+    seed = hash((market_id, interval, open_time)) & 0xFFFFFFFF
+    rng = np.random.default_rng(seed)
+    base = 100 + (open_time // INTERVAL_MS[interval]) % 50
+    open_, close = base + rng.normal(size=2)
+    high = max(open_, close) + abs(rng.normal())
+    low = min(open_, close) - abs(rng.normal())
+    return open_time, open_, high, low, close, float(rng.uniform(1, 10))
+
+def _market(symbol):
+    base, quote = symbol.split("/")
+    return {
+        "symbol": base + quote, "status": "TRADING", "baseAsset": base, "quoteAsset": quote,
+        "baseAssetPrecision": 8, "quotePrecision": 8, "quoteAssetPrecision": 8,
+        "orderTypes": ["LIMIT", "MARKET"], "isSpotTradingAllowed": True, "isMarginTradingAllowed": False,
+        "permissions": ["SPOT"], "permissionSets": [["SPOT"]], "filters": []
+    }
+
+def create_app(symbols=SYMBOLS, tick=TICK_SECONDS):
+    """Aplicación aiohttp con los endpoints REST y websocket descritos en el módulo."""
+    stats = {"klines_requests": 0, "subscriptions": []}
+
+    async def exchange_info(request):
+        # Solo los mercados spot; futuros y opciones responden sin símbolos
+        spot = request.path.startswith("/api/")
+        return web.json_response({"timezone": "UTC", "serverTime": _now_ms(), "rateLimits": [],
+                                  "symbols": [_market(s) for s in symbols] if spot else []})
+
+    async def klines(request):
+        stats["klines_requests"] += 1
+        market_id = request.query["symbol"]
+        interval = request.query["interval"]
+        step = INTERVAL_MS[interval]
+        limit = min(int(request.query.get("limit", 500)), MAX_KLINES)
+        current = _now_ms() // step * step
+        start = int(request.query.get("startTime", current - (limit - 1) * step))
+        start = -(-start // step) * step  # Primera vela con apertura >= startTime
+        rows = []
+        for open_time in range(start, current + 1, step)[:limit]:
+            t, o, h, l, c, v = synthetic_kline(market_id, interval, open_time)
+            rows.append([t, f"{o:.4f}", f"{h:.4f}", f"{l:.4f}", f"{c:.4f}", f"{v:.4f}", t + step - 1,
+                         "0", 1, "0", "0", "0"])
+        return web.json_response(rows)
+
+    async def websocket(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        streams = set()
+
+        async def push():
+            while not ws.closed:
+                await asyncio.sleep(tick)
+                for stream_name in list(streams):
+                    market_id, kline_type = stream_name.split("@")
+                    interval = kline_type.split("_", 1)[1]
+                    step = INTERVAL_MS[interval]
+                    t, o, h, l, c, v = synthetic_kline(market_id.upper(), interval, _now_ms() // step * step)
+                    await ws.send_json({"e": "kline", "E": _now_ms(), "s": market_id.upper(), "k": {
+                        "t": t, "T": t + step - 1, "s": market_id.upper(), "i": interval,
+                        "o": f"{o:.4f}", "c": f"{c:.4f}", "h": f"{h:.4f}", "l": f"{l:.4f}", "v": f"{v:.4f}",
+                        "n": 1, "x": False
+                    }})
+
+        pusher = asyncio.ensure_future(push())
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                data = json.loads(msg.data)
+                if data.get("method") == "SUBSCRIBE":
+                    streams.update(data.get("params", []))
+                    stats["subscriptions"].extend(data.get("params", []))
+                    await ws.send_json({"result": None, "id": data.get("id")})
+        finally:
+            pusher.cancel()
+        return ws
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_get("/{prefix:.*}/exchangeInfo", exchange_info)
+    app.router.add_get("/api/v3/klines", klines)
+    app.router.add_get("/stream/{tail:.*}", websocket)
+    return app
+
+async def serve(host=HOST, port=PORT, **kwargs):
+    """Arranca el servidor y retorna (runner, app); detenerlo con 'await runner.cleanup()'."""
+    app = create_app(**kwargs)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner, app
+
+async def check(host=HOST, port=PORT, timeframe="1h", seconds=3, outage=1500):
+    """
+    Ejecuta stream.run_stream contra el servidor local durante 'seconds' segundos, partiendo
+    de un buffer cuya última vela es de hace 'outage' velas (más de una página REST), y
+    verifica que el buffer queda al día y sin huecos. Retorna True si todo es correcto.
+    """
+    import stream
+    import market
+    runner, app = await serve(host, port)
+    step = INTERVAL_MS[timeframe]
+    symbol = SYMBOLS[0]
+    coin_id = market.resolve_coin_id(symbol)
+    base, quote = symbol.split("/")
+    # Buffer con una vela antigua: simula un corte de 'outage' velas
+    stale = _now_ms() // step * step - outage * step
+    stream._merge(coin_id, [list(synthetic_kline(base + quote, timeframe, stale))])
+    task = asyncio.ensure_future(stream.run_stream([symbol], timeframe, f"ws://{host}:{port}/stream/ws",
+                                                   f"http://{host}:{port}"))
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await runner.cleanup()
+    buf = stream.get_stream_candles(coin_id)
+    if buf is None:
+        print("[Error] El stream no recibió velas.")
+        return False
+    ts = buf.timestamps()
+    gaps = int(np.count_nonzero(np.diff(ts) != step))
+    current = ts[-1] == _now_ms() // step * step
+    stats = app["stats"]
+    print(f"[INFO] {len(buf)} velas, {gaps} huecos, al día: {current}, peticiones REST: "
+          f"{stats['klines_requests']}, suscripciones: {stats['subscriptions']}")
+    return gaps == 0 and current and bool(stats["subscriptions"])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--check", action="store_true", help="prueba stream.py contra el servidor y termina")
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(0 if asyncio.run(check(args.host, args.port)) else 1)
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import time
+import queue
+import logging
+import multiprocessing as mp
+import ipc
+import profiler
+import stream
+from config import HEALTH_CHECK_INTERVAL
+
+# Segundos sin latido tras los cuales se considera que un rol está colgado.
+# El monitor duerme 5 minutos entre ciclos, por eso su margen es mayor.
+ROLE_TIMEOUTS = {
+    "monitor": 900,
+    "bot": 300,
+    "renderer": 180
+}
+RENDER_POLL_INTERVAL = 10  # Segundos de espera en la cola antes de emitir un latido
+
+# Reinicios con backoff exponencial por rol: RESTART_DELAY, 2x, 4x... hasta MAX_RESTART_DELAY.
+# Un rol que se mantiene sano STABLE_AFTER segundos vuelve a empezar desde RESTART_DELAY;
+# tras MAX_FAILURES fallos seguidos se abandona.
+RESTART_DELAY = 5
+MAX_RESTART_DELAY = 600
+STABLE_AFTER = 600
+MAX_FAILURES = 10
+
+def renderer_loop():
+    """Consume trabajos de gráficos de la cola compartida y los envía a Telegram."""
+    from PrintGraphic import send_graphic
+    jobs = ipc.render_queue()
+    while True:
+        ipc.heartbeat()
+        try:
+            job = jobs.get(timeout=RENDER_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+        send_graphic(job["chat_id"], job["timeframe_input"], job["chart_type"], job["days"])
+
+def _run_role(role, channel):
+    """Punto de entrada de cada proceso hijo."""
+    ipc.attach(channel, role)
+    ipc.heartbeat()
+    profiler.start()
+    # Solo el monitor abre el websocket; el resto lee las velas que publica (ver ipc.publish_candles)
+    stream.start(ingest=(role == "monitor"))
+    if role == "monitor":
+        from monitor_market import monitor_market
+        monitor_market()
+    elif role == "bot":
+        from telegram_bot import telegram_bot_loop
+        telegram_bot_loop()
+    elif role == "renderer":
+        renderer_loop()
+    else:
+        raise ValueError(f"Rol desconocido: {role}")
+
+def _start_role(ctx, role, channel):
+    channel["heartbeats"][role] = time.time()
+    process = ctx.Process(target=_run_role, args=(role, channel), name=f"higgs-{role}", daemon=True)
+    process.start()
+    logging.info("Rol %s iniciado (pid %s).", role, process.pid)
+    return process
+
+def run_supervisor(roles=("monitor", "bot", "renderer")):
+    """
+    Ejecuta cada rol en su propio proceso y los vigila:
+      - Los roles publican latidos e indicadores en un canal compartido (ver ipc.py).
+      - Si un proceso termina o deja de latir, se detiene y se reinicia con backoff exponencial
+        (ver RESTART_DELAY); un rol que falla MAX_FAILURES veces seguidas se abandona.
+    """
+    ctx = mp.get_context("spawn")
+    manager = ctx.Manager()
+    channel = {
+        "heartbeats": manager.dict(),
+        "snapshots": manager.dict(),
+        "candles": manager.dict(),
+        # Cola del manager: sobrevive a que el supervisor termine a un consumidor colgado
+        # (terminar un proceso que usa una mp.Queue puede dejarla corrupta)
+        "render_queue": manager.Queue()
+    }
+    processes = {role: _start_role(ctx, role, channel) for role in roles}
+    started = {role: time.time() for role in roles}
+    failures = {role: 0 for role in roles}
+    restart_at = {}
+
+    try:
+        while processes or restart_at:
+            time.sleep(HEALTH_CHECK_INTERVAL)
+            now = time.time()
+            for role, when in list(restart_at.items()):
+                if now >= when:
+                    del restart_at[role]
+                    processes[role] = _start_role(ctx, role, channel)
+                    started[role] = now
+            for role, process in list(processes.items()):
+                last_beat = channel["heartbeats"].get(role, 0)
+                if process.is_alive() and now - last_beat <= ROLE_TIMEOUTS[role]:
+                    if now - started[role] >= STABLE_AFTER:
+                        failures[role] = 0
+                    continue
+                if process.is_alive():
+                    logging.error("Rol %s sin latido desde hace %.0fs.", role, now - last_beat)
+                    process.terminate()
+                    process.join(5)
+                else:
+                    logging.error("Rol %s terminó con código %s.", role, process.exitcode)
+                del processes[role]
+                failures[role] += 1
+                if failures[role] >= MAX_FAILURES:
+                    logging.critical("Rol %s abandonado tras %d fallos seguidos.", role, failures[role])
+                    continue
+                delay = min(RESTART_DELAY * 2 ** (failures[role] - 1), MAX_RESTART_DELAY)
+                logging.error("Reiniciando rol %s en %ds (fallo %d de %d).", role, delay, failures[role], MAX_FAILURES)
+                restart_at[role] = now + delay
+        logging.critical("Todos los roles fueron abandonados; el supervisor termina.")
+    finally:
+        for process in processes.values():
+            process.terminate()
+        manager.shutdown()
@@ -1,9 +1,11 @@
 import time
 from telegram_handler import get_updates, handle_telegram_message
+import ipc
 
 def telegram_bot_loop():
     offset = None
     while True:
+        ipc.heartbeat()
         try:
             updates = get_updates(offset)
             if updates:
@@ -2,11 +2,16 @@ import requests
 import openai
 import time
 from langdetect import detect
-from config import TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, OPENAI_API_KEY, SYMBOL, TIMEFRAME
-from market import fetch_historical_data
+from config import (TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, OPENAI_API_KEY, SYMBOL, TIMEFRAME, SNAPSHOT_MAX_AGE, WATCHLIST,
+                    WATCHLIST_SNAPSHOT)
+from market import fetch_historical_data, get_ticker, cached_candles, STALE_INTERVALS
 from indicators import calculate_indicators_for_bnb, check_cross_signals
 from btc_indicators import get_btc_indicators
 from ml_model import aggregate_signals
+import ipc
+from prompt_builder import build_analysis_request
+from intent_router import route, dispatch, register
+from screener import evaluate_buffers, top_by, screen
 
 # Configurar API key de OpenAI
 openai.api_key = OPENAI_API_KEY
@@ -34,20 +39,19 @@ def detect_language(text):
     """Forzamos siempre el español."""
     return 'es'
 
-def detectar_activo(mensaje, contexto=None):
+def obtener_indicadores(activo):
     """
-    Detecta el activo (BNB o BTC) a partir del contexto almacenado o del mensaje.
-    Si ya existe en el contexto, se devuelve ese valor.
+    Devuelve los indicadores del activo ("BNB" o "BTC"). En modo multiproceso se reutiliza
+    el snapshot publicado por el monitor si es reciente; si no, se calculan en el momento.
     """
-    if contexto and "activo" in contexto:
-        return contexto["activo"]
-    mensaje = mensaje.lower()
-    if "btc" in mensaje:
-        return "BTC"
-    elif "bnb" in mensaje:
-        return "BNB"
-    else:
-        return None
+    snapshot = ipc.get_snapshot(activo, SNAPSHOT_MAX_AGE)
+    if snapshot is not None:
+        return snapshot
+    if activo == "BNB":
+        return calculate_indicators_for_bnb()
+    elif activo == "BTC":
+        return get_btc_indicators()
+    raise Exception("Activo no soportado.")
 
 def construir_historial(chat_id, max_msgs=5):
     """
@@ -57,12 +61,22 @@ def construir_historial(chat_id, max_msgs=5):
     hist = conversation_history.get(chat_id, {}).get("messages", [])
     return hist[-max_msgs:]  # Últimos max_msgs mensajes
 
+def senales_universo():
+    """
+    Señales del screener para la lista de seguimiento sin nuevas peticiones a CoinGecko:
+    el snapshot publicado por el monitor (modo multiproceso) o las velas recientes que el
+    monitor ya tiene en memoria (modo hilos).
+    """
+    signals = ipc.get_snapshot(WATCHLIST_SNAPSHOT, SNAPSHOT_MAX_AGE)
+    if signals is None:
+        signals = evaluate_buffers(cached_candles(WATCHLIST, max_intervals=STALE_INTERVALS))
+    return signals
+
 def handle_telegram_message(update):
     """
     Procesa los mensajes recibidos en Telegram y responde según el contenido.
-    Se delega la obtención de indicadores a funciones especializadas:
-      - Para BNB: calculate_indicators_for_bnb().
-      - Para BTC: get_btc_indicators().
+    La intención se obtiene con intent_router.route() y se delega a la función registrada
+    para ella (responder_*). Los indicadores se obtienen con obtener_indicadores().
     Además, se utiliza el historial de conversación para enriquecer el contexto del prompt.
     """
     global conversation_history, pending_requests
@@ -103,203 +117,161 @@ def handle_telegram_message(update):
     conversation_history.setdefault(chat_id, {"messages": [], "context": {}})
     conversation_history[chat_id]["messages"].append({"role": "user", "content": message_text})
 
-    # Rama: Respuesta rápida a saludos sencillos
-    greetings = ["hola", "que onda", "buenos", "saludos"]
-    if lower_msg in greetings:
-        send_telegram_message("¡Hola! Estoy en la blockchain analizando el mercado, listo para ayudarte.", chat_id)
-        return
+    # Clasificación en una sola pasada: intención, activo, intervalo y rango
+    ruta = route(message_text)
+    intent = ruta["intent"]
 
-    # Rama: Solicitud de gráfico (si se menciona "grafico" o "gráfico")
-    if "grafico" in lower_msg or "gráfico" in lower_msg:
-        try:
-            from PrintGraphic import send_graphic, extract_timeframe
-            timeframe_req = extract_timeframe(lower_msg)
-            chart_type = "line"
-            if any(word in lower_msg for word in ["vela", "candlestick", "japonesas"]):
-                chart_type = "candlestick"
-            send_graphic(chat_id, timeframe_req, chart_type)
-        except Exception as e:
-            send_telegram_message(f"Error al generar gráfico: {e}", chat_id)
-        return
+    # Determinar activo (contexto almacenado o mensaje) para las intenciones que lo requieren
+    activo = None
+    if intent is None or ruta["needs_asset"]:
+        contexto = conversation_history[chat_id].get("context", {})
+        activo = contexto.get("activo") or ruta["activo"]
+        if not activo:
+            send_telegram_message("¿Deseas la actualización de BNB o BTC?", chat_id)
+            pending_requests[chat_id] = "seleccionar_activo"
+            return
+        conversation_history[chat_id]["context"]["activo"] = activo
 
-    # Rama: Si el mensaje contiene "dominancia", responder con análisis de BTC
-    if "dominancia" in lower_msg:
+    if not dispatch(intent, chat_id, activo, ruta, message_text):
+        # Fallback: Si la consulta no coincide con ninguna rama, se pide mayor especificidad.
         try:
-            btc_indicators = get_btc_indicators()
-            btc_price = btc_indicators['price']
-            btc_dominance = btc_indicators['dominance']
-            answer = (f"Actualmente, BTC se cotiza a ${btc_price:.2f} y su dominancia es de {btc_dominance:.2f}%.\n"
-                      "Un aumento en la dominancia, especialmente si el precio baja, puede señalar manipulación en el mercado.")
-            send_telegram_message(answer, chat_id)
-            conversation_history[chat_id]["messages"].append({"role": "assistant", "content": answer})
+            fallback_message = "No entendí tu solicitud. ¿Podrías reformular o especificar un poco más tu consulta?"
+            send_telegram_message(fallback_message, chat_id)
         except Exception as e:
-            send_telegram_message(f"Error al obtener la dominancia: {e}", chat_id)
-        return
+            print(f"[Error] Fallback: {e}")
 
-    # Determinar activo usando el contexto almacenado o el mensaje
-    activo = detectar_activo(message_text, conversation_history[chat_id].get("context"))
-    if not activo:
-        # Si no se detecta, se utiliza el activo previamente seleccionado (si existe)
-        activo = conversation_history[chat_id].get("context", {}).get("activo")
-    if not activo:
-        send_telegram_message("¿Deseas la actualización de BNB o BTC?", chat_id)
-        pending_requests[chat_id] = "seleccionar_activo"
-        return
-    else:
-        conversation_history[chat_id]["context"]["activo"] = activo
+def _responder(chat_id, answer):
+    """Envía la respuesta y la agrega al historial de conversación."""
+    send_telegram_message(answer, chat_id)
+    conversation_history[chat_id]["messages"].append({"role": "assistant", "content": answer})
 
-    # Rama: Consulta de precio
-    if "precio" in lower_msg:
-        try:
-            if activo == "BNB":
-                indicators = calculate_indicators_for_bnb()
-                answer = f"El precio actual de BNB es: ${indicators['price']:.2f}"
-            elif activo == "BTC":
-                btc_indicators = get_btc_indicators()
-                answer = f"El precio actual de BTC es: ${btc_indicators['price']:.2f}"
-            else:
-                answer = "Activo no reconocido para consulta de precio."
-            send_telegram_message(answer, chat_id)
-            conversation_history[chat_id]["messages"].append({"role": "assistant", "content": answer})
-        except Exception as e:
-            send_telegram_message(f"Error al obtener el precio: {e}", chat_id)
-        return
+# --- Respuestas por intención (ver intent_router.INTENTS) ---
+# Todas reciben (chat_id, activo, ruta, message_text); activo es None si la intención no lo requiere.
 
-    # Rama: Consulta compleja (análisis, estrategia, indicadores, cruces, etc.)
-    complex_keywords = ["analiza", "análisis", "analisis", "compara", "estrategia", "actualizacion", 
-                          "actualización", "indicadores", "entrada", "long", "short", "cruce", "movil"]
-    if any(keyword in lower_msg for keyword in complex_keywords):
-        try:
-            if activo == "BNB":
-                indicators = calculate_indicators_for_bnb()
-            elif activo == "BTC":
-                indicators = get_btc_indicators()
-            else:
-                raise Exception("Activo no soportado.")
-        except Exception as e:
-            fallback_context = ("No se pudieron obtener datos técnicos en tiempo real. "
-                                "Revisa una plataforma de trading para obtener información actualizada.")
-            send_telegram_message(fallback_context, chat_id)
-            return
+@register("saludo")
+def responder_saludo(chat_id, activo, ruta, message_text):
+    send_telegram_message("¡Hola! Estoy en la blockchain analizando el mercado, listo para ayudarte.", chat_id)
 
-        # Incluir los últimos 3 mensajes del historial para dar contexto a OpenAI
-        historial = construir_historial(chat_id, max_msgs=3)
-        system_prompt = (
-            "Eres Higgs, Agente X. Eres un experto en trading y un agente en la blockchain, tienes acceso a datos técnicos actualizados, "
-            "además del historial de conversación. Responde con el tono misterioso y profesional que te caracteriza. "
-            "Analiza la siguiente información y genera un análisis robusto que complemente los datos técnicos. "
-            "Si es necesario, complementa con tu conocimiento de mercado."
-        )
-        context_text = (
-            f"Historial reciente: {historial}\n\n"
-            f"Indicadores técnicos actuales para {activo}:\n"
-            f"• Precio: ${indicators['price']:.2f}\n"
-            f"• RSI: {indicators['rsi']:.2f}\n"
-            f"• MACD: {indicators['macd']:.2f} (Señal: {indicators['macd_signal']:.2f})\n"
-            f"• SMA10: {indicators['sma_10']:.2f} | SMA25: {indicators['sma_25']:.2f} | SMA50: {indicators['sma_50']:.2f}\n"
-            f"• Bollinger Bands: Bajo ${indicators['bb_low']:.2f}, Medio ${indicators['bb_medium']:.2f}, Alto ${indicators['bb_high']:.2f}\n\n"
-            f"Pregunta: {message_text}"
-        )
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": context_text}
-        ]
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=messages,
-                max_tokens=500,
-                temperature=0.7
-            )
-            answer = response.choices[0].message.content.strip()
-            send_telegram_message(answer, chat_id)
-            conversation_history[chat_id]["messages"].append({"role": "assistant", "content": answer})
-        except Exception as e:
-            error_msg = f"⚠️ Error al procesar la solicitud: {e}"
-            send_telegram_message(error_msg, chat_id)
-        return
+@register("grafico")
+def responder_grafico(chat_id, activo, ruta, message_text):
+    try:
+        from PrintGraphic import send_graphic
+        days_req = ruta["days"] or 14
+        # En modo multiproceso el gráfico se delega al rol renderer
+        if not ipc.submit_render(chat_id, ruta["timeframe"], ruta["chart_type"], days_req):
+            send_graphic(chat_id, ruta["timeframe"], ruta["chart_type"], days_req)
+    except Exception as e:
+        send_telegram_message(f"Error al generar gráfico: {e}", chat_id)
 
-    # Rama: Consultas específicas (ej. RSI, MACD, SMA, CMF)
-    if "rsi" in lower_msg and "indicador" not in lower_msg:
-        try:
-            if activo == "BNB":
-                indicators = calculate_indicators_for_bnb()
-                answer = f"El RSI actual para BNB es: {indicators['rsi']:.2f}"
-            elif activo == "BTC":
-                btc_indicators = get_btc_indicators()
-                answer = f"El RSI actual para BTC es: {btc_indicators['rsi']:.2f}"
-            else:
-                answer = "Activo no reconocido."
-            send_telegram_message(answer, chat_id)
-            conversation_history[chat_id]["messages"].append({"role": "assistant", "content": answer})
-        except Exception as e:
-            send_telegram_message(f"Error al obtener el RSI: {e}", chat_id)
-        return
+@register("dominancia")
+def responder_dominancia(chat_id, activo, ruta, message_text):
+    try:
+        btc_indicators = obtener_indicadores("BTC")
+        btc_price = btc_indicators['price']
+        btc_dominance = btc_indicators['dominance']
+        answer = (f"Actualmente, BTC se cotiza a ${btc_price:.2f} y su dominancia es de {btc_dominance:.2f}%.\n"
+                  "Un aumento en la dominancia, especialmente si el precio baja, puede señalar manipulación en el mercado.")
+        _responder(chat_id, answer)
+    except Exception as e:
+        send_telegram_message(f"Error al obtener la dominancia: {e}", chat_id)
 
-    if "macd" in lower_msg:
-        try:
-            if activo == "BNB":
-                indicators = calculate_indicators_for_bnb()
-                answer = f"El MACD actual para BNB es: {indicators['macd']:.2f} (Señal: {indicators['macd_signal']:.2f})"
-            elif activo == "BTC":
-                btc_indicators = get_btc_indicators()
-                answer = f"El MACD actual para BTC es: {btc_indicators['macd']:.2f} (Señal: {btc_indicators['macd_signal']:.2f})"
-            else:
-                answer = "Activo no reconocido."
-            send_telegram_message(answer, chat_id)
-            conversation_history[chat_id]["messages"].append({"role": "assistant", "content": answer})
-        except Exception as e:
-            send_telegram_message(f"Error al obtener el MACD: {e}", chat_id)
-        return
+@register("ranking")
+def responder_ranking(chat_id, activo, ruta, message_text):
+    try:
+        ranked = top_by(senales_universo(), "rsi")
+        if not ranked:
+            answer = "No hay datos suficientes para el ranking."
+        else:
+            answer = "Ranking por RSI:\n" + "\n".join(f"• {coin}: {value:.2f}" for coin, value in ranked)
+        _responder(chat_id, answer)
+    except Exception as e:
+        send_telegram_message(f"Error al generar el ranking: {e}", chat_id)
 
-    if "sma" in lower_msg:
-        try:
-            if activo == "BNB":
-                indicators = calculate_indicators_for_bnb()
-                answer = (
-                    f"Valores SMA para BNB:\n"
-                    f"• SMA10: {indicators['sma_10']:.2f}\n"
-                    f"• SMA25: {indicators['sma_25']:.2f}\n"
-                    f"• SMA50: {indicators['sma_50']:.2f}"
-                )
-            elif activo == "BTC":
-                btc_indicators = get_btc_indicators()
-                answer = (
-                    f"Valores SMA para BTC:\n"
-                    f"• SMA10: {btc_indicators['sma_10']:.2f}\n"
-                    f"• SMA25: {btc_indicators['sma_25']:.2f}\n"
-                    f"• SMA50: {btc_indicators['sma_50']:.2f}"
-                )
-            else:
-                answer = "Activo no reconocido."
-            send_telegram_message(answer, chat_id)
-            conversation_history[chat_id]["messages"].append({"role": "assistant", "content": answer})
-        except Exception as e:
-            send_telegram_message(f"Error al obtener las SMA: {e}", chat_id)
-        return
+@register("squeeze")
+def responder_squeeze(chat_id, activo, ruta, message_text):
+    try:
+        signals = senales_universo()
+        coins = screen(signals, "squeeze")
+        if not signals:
+            answer = "No hay datos suficientes para buscar compresiones."
+        elif coins:
+            answer = "Monedas con bandas de Bollinger en compresión:\n" + "\n".join(f"• {coin}" for coin in coins)
+        else:
+            answer = "Ninguna moneda de la lista de seguimiento está en compresión."
+        _responder(chat_id, answer)
+    except Exception as e:
+        send_telegram_message(f"Error al buscar compresiones: {e}", chat_id)
 
-    if "cmf" in lower_msg:
-        try:
-            if activo == "BNB":
-                indicators = calculate_indicators_for_bnb()
-                answer = f"El CMF para BNB es: {indicators['cmf']:.2f}"
-            elif activo == "BTC":
-                btc_indicators = get_btc_indicators()
-                answer = f"El CMF para BTC es: {btc_indicators['cmf']:.2f}"
-            else:
-                answer = "Activo no reconocido."
-            send_telegram_message(answer, chat_id)
-            conversation_history[chat_id]["messages"].append({"role": "assistant", "content": answer})
-        except Exception as e:
-            send_telegram_message(f"Error al obtener el CMF: {e}", chat_id)
+@register("precio")
+def responder_precio(chat_id, activo, ruta, message_text):
+    try:
+        ticker = get_ticker(activo)
+        answer = f"El precio actual de {activo} es: ${ticker['price']:.2f}"
+        if ticker['change_24h'] is not None:
+            answer += f" ({ticker['change_24h']:+.2f}% en 24h)"
+        _responder(chat_id, answer)
+    except Exception as e:
+        send_telegram_message(f"Error al obtener el precio: {e}", chat_id)
+
+@register("analisis")
+def responder_analisis(chat_id, activo, ruta, message_text):
+    """Consulta compleja (análisis, estrategia, indicadores, cruces, etc.) respondida por OpenAI."""
+    try:
+        indicators = obtener_indicadores(activo)
+    except Exception as e:
+        fallback_context = ("No se pudieron obtener datos técnicos en tiempo real. "
+                            "Revisa una plataforma de trading para obtener información actualizada.")
+        send_telegram_message(fallback_context, chat_id)
         return
 
-    # Fallback: Si la consulta no coincide con ninguna rama, se pide mayor especificidad.
+    # El historial se recorta al presupuesto de tokens y el modelo se elige según la intención
+    historial = construir_historial(chat_id, max_msgs=10)
+    request = build_analysis_request(activo, indicators, historial, message_text, ruta)
+    try:
+        response = openai.ChatCompletion.create(temperature=0.7, **request)
+        answer = response.choices[0].message.content.strip()
+        _responder(chat_id, answer)
+    except Exception as e:
+        error_msg = f"⚠️ Error al procesar la solicitud: {e}"
+        send_telegram_message(error_msg, chat_id)
+
+@register("rsi")
+def responder_rsi(chat_id, activo, ruta, message_text):
+    try:
+        indicators = obtener_indicadores(activo)
+        _responder(chat_id, f"El RSI actual para {activo} es: {indicators['rsi']:.2f}")
+    except Exception as e:
+        send_telegram_message(f"Error al obtener el RSI: {e}", chat_id)
+
+@register("macd")
+def responder_macd(chat_id, activo, ruta, message_text):
+    try:
+        indicators = obtener_indicadores(activo)
+        _responder(chat_id, f"El MACD actual para {activo} es: {indicators['macd']:.2f} (Señal: {indicators['macd_signal']:.2f})")
+    except Exception as e:
+        send_telegram_message(f"Error al obtener el MACD: {e}", chat_id)
+
+@register("sma")
+def responder_sma(chat_id, activo, ruta, message_text):
+    try:
+        indicators = obtener_indicadores(activo)
+        answer = (
+            f"Valores SMA para {activo}:\n"
+            f"• SMA10: {indicators['sma_10']:.2f}\n"
+            f"• SMA25: {indicators['sma_25']:.2f}\n"
+            f"• SMA50: {indicators['sma_50']:.2f}"
+        )
+        _responder(chat_id, answer)
+    except Exception as e:
+        send_telegram_message(f"Error al obtener las SMA: {e}", chat_id)
+
+@register("cmf")
+def responder_cmf(chat_id, activo, ruta, message_text):
     try:
-        fallback_message = "No entendí tu solicitud. ¿Podrías reformular o especificar un poco más tu consulta?"
-        send_telegram_message(fallback_message, chat_id)
+        indicators = obtener_indicadores(activo)
+        _responder(chat_id, f"El CMF para {activo} es: {indicators['cmf']:.2f}")
     except Exception as e:
-        print(f"[Error] Fallback: {e}")
+        send_telegram_message(f"Error al obtener el CMF: {e}", chat_id)
 
 def analyze_sma_crosses(df):
     """